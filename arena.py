@@ -0,0 +1,369 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from engine import WALL, Apple, AnytimeSearch, Grid, Snake, astar, bfs, grid_size_error
+
+ARENA_STRATEGIES = ("A*", "BFS", "Anytime")
+
+# Per-process search state for plan_batch(), one Grid per board size
+_grids = {}
+_searches = {}
+
+def greedy_step(grid, head, goal, tail=None, behind=None):
+    # Fallback when no route is found or the plan is late: the open neighbour
+    # nearest the apple, None if the head is boxed in
+    occupancy, stride = grid.occupancy, grid.stride
+    goal_y, goal_x = divmod(goal, stride)
+    best = None
+    best_distance = None
+    for step in grid.steps:
+        cell = head + step
+        if (occupancy[cell] and cell != tail) or cell == behind:
+            continue
+        y, x = divmod(cell, stride)
+        distance = abs(x - goal_x) + abs(y - goal_y)
+        if best is None or distance < best_distance:
+            best = cell
+            best_distance = distance
+    return best
+
+def plan_move(grid, strategy, anytime, head, goal, tail, behind):
+    # Next cell for one snake; the second value is True if it came from the fallback.
+    # behind is Snake.behind_cell, which the snake can't turn back into.
+    if strategy == "A*":
+        path = astar(grid, head, goal)
+    elif strategy == "Anytime":
+        path = anytime.search(grid, head, goal, tail)
+    else:
+        path = bfs(grid, head, goal, tail)
+    if path and path[0] != behind:
+        return path[0], False
+    return greedy_step(grid, head, goal, tail, behind), True
+
+def plan_batch(job):
+    # Runs in a worker process: plans a batch of snakes against one snapshot of
+    # the board. Sending one job per worker per tick keeps the pickling to one
+    # copy of the occupancy grid per worker, not one per snake.
+    width, height, occupancy, strategy, plan_budget, requests = job
+    grid = _grids.get((width, height))
+    if grid is None:
+        grid = _grids[(width, height)] = Grid(width, height)
+    anytime = _searches.get(plan_budget)
+    if anytime is None:
+        anytime = _searches[plan_budget] = AnytimeSearch(plan_budget)
+    grid.occupancy[:] = occupancy
+    return [plan_move(grid, strategy, anytime, *request) for request in requests]
+
+def head_on(snakes, contenders, dying):
+    longest = max(snakes[i].length for i in contenders)
+    winners = [i for i in contenders if snakes[i].length == longest]
+    for i in contenders:
+        if len(winners) > 1 or i != winners[0]:
+            dying.setdefault(i, 'head_on')
+
+# Many AI snakes and several apples on one Grid. Every snake lives in the same
+# occupancy array, so a collision check against all of them is one lookup.
+# Each tick is simultaneous: every snake plans against the board as it was at
+# the start of the tick, then all the moves are resolved together.
+#
+# - A head on a wall, or on a body cell that isn't a tail moving away this
+#   tick, dies.
+# - Heads meeting on one cell, or swapping cells, are a head-on collision. The
+#   strictly longest snake survives; on a tie they all die.
+# - Dead snakes are cleared off the board. With respawn they come back at
+#   length 1 on a random free cell.
+#
+# Planning runs inline, or across `workers` processes with the snakes split
+# into one batch per worker. Whatever hasn't finished by tick_budget seconds
+# takes the greedy step instead, and the snake is counted as a miss. Arena
+# searches don't use a PathCache. Every plan is a fresh search, so a game
+# plays the same however many workers it runs on.
+class Arena:
+    def __init__(self, num_snakes=24, num_apples=8, width=80, height=60, strategy="A*", seed=None, max_steps=None,
+                 workers=0, tick_budget=None, plan_budget=2000, respawn=False):
+        if strategy not in ARENA_STRATEGIES:
+            raise ValueError(f"arena strategy must be one of {', '.join(ARENA_STRATEGIES)}, not {strategy!r}")
+        error = grid_size_error(width, height, cycle=False)
+        if error:
+            raise ValueError(error)
+        if num_snakes + num_apples > width * height // 4:
+            raise ValueError(f"{num_snakes} snakes and {num_apples} apples don't fit on a {width}x{height} grid")
+        self.num_snakes = num_snakes
+        self.num_apples = num_apples
+        self.strategy = strategy
+        self.max_steps = max_steps
+        self.tick_budget = tick_budget
+        self.plan_budget = plan_budget
+        self.respawn = respawn
+        self.seeds = random.Random(seed)
+        self.rng = random.Random()
+        self.grid = Grid(width, height)
+        self.anytime = AnytimeSearch(plan_budget)
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self.plans = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.seeds.getrandbits(64)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.grid.clear()
+        self.apples = []
+        self.snakes = [self.spawn() for _ in range(self.num_snakes)]
+        self.alive = [True] * self.num_snakes
+        self.scores = [0] * self.num_snakes
+        self.deaths = [None] * self.num_snakes
+        for _ in range(self.num_apples):
+            self.add_apple()
+        self.steps = 0
+        self.done = False
+
+    def spawn(self, snake=None):
+        # A length 1 snake on a random free cell without an apple, None if there
+        # is no such cell. A dead snake passed in is reused, so respawning
+        # doesn't allocate another full-board ring.
+        grid = self.grid
+        if not grid.free:
+            return None
+        taken = {apple.cell for apple in self.apples}
+        cell = grid.free[self.rng.randrange(len(grid.free))]
+        if cell in taken:
+            open_cells = [cell for cell in grid.free if cell not in taken]
+            if not open_cells:
+                return None
+            cell = open_cells[self.rng.randrange(len(open_cells))]
+        if snake is None:
+            snake = Snake(grid, cell)
+        else:
+            snake.length = 1
+            snake.reset([cell])
+        snake.direction = self.rng.choice(('left', 'right', 'up', 'down'))
+        return snake
+
+    def add_apple(self):
+        apple = Apple(self.rng, self.grid)
+        if self.place(apple):
+            self.apples.append(apple)
+
+    def place(self, apple):
+        # Apples don't mark the grid, so one landing on another draws again
+        taken = {other.cell for other in self.apples if other is not apple}
+        for _ in range(len(self.grid.free) + 1):
+            if apple.cell not in taken:
+                return True
+            if not apple.move():
+                break
+        return False
+
+    def nearest_apple(self, head):
+        stride = self.grid.stride
+        head_y, head_x = divmod(head, stride)
+        best = None
+        best_distance = None
+        for apple in self.apples:
+            y, x = divmod(apple.cell, stride)
+            distance = abs(x - head_x) + abs(y - head_y)
+            if best is None or distance < best_distance:
+                best = apple.cell
+                best_distance = distance
+        return best
+
+    def plan_requests(self):
+        requests = []
+        for i, snake in enumerate(self.snakes):
+            if self.alive[i]:
+                head = snake.head_cell
+                goal = self.nearest_apple(head)
+                if goal is None:
+                    goal = head
+                requests.append((i, head, goal, snake.moving_tail, snake.behind_cell))
+        return requests
+
+    def plan(self):
+        # Next cell per live snake, keyed by index
+        requests = self.plan_requests()
+        deadline = time.perf_counter() + self.tick_budget if self.tick_budget is not None else None
+        moves = {}
+        if self.executor is None:
+            for i, *request in requests:
+                if deadline is not None and time.perf_counter() > deadline:
+                    moves[i] = self.late_move(*request)
+                    continue
+                cell, from_fallback = plan_move(self.grid, self.strategy, self.anytime, *request)
+                self.fallbacks += from_fallback
+                moves[i] = cell
+            self.plans += len(requests)
+            return moves
+
+        occupancy = bytes(self.grid.occupancy)
+        batches = [requests[k::self.workers] for k in range(self.workers)]
+        futures = {}
+        for batch in batches:
+            if batch:
+                job = (self.grid.width, self.grid.height, occupancy, self.strategy, self.plan_budget,
+                       [request for _, *request in batch])
+                futures[self.executor.submit(plan_batch, job)] = batch
+        timeout = max(0, deadline - time.perf_counter()) if deadline is not None else None
+        finished, late = wait(futures, timeout)
+        for future in finished:
+            for (i, *_), (cell, from_fallback) in zip(futures[future], future.result()):
+                self.fallbacks += from_fallback
+                moves[i] = cell
+        for future in late:
+            # The worker still finishes the batch; its answer is just no use any more
+            future.cancel()
+            for i, *request in futures[future]:
+                moves[i] = self.late_move(*request)
+        self.plans += len(requests)
+        return moves
+
+    def late_move(self, head, goal, tail, behind):
+        self.misses += 1
+        self.fallbacks += 1
+        return greedy_step(self.grid, head, goal, tail, behind)
+
+    def step(self, moves=None):
+        if moves is None:
+            moves = self.plan()
+        grid = self.grid
+        occupancy = grid.occupancy
+        snakes, alive = self.snakes, self.alive
+        live = [i for i in range(self.num_snakes) if alive[i]]
+
+        for i in live:
+            cell = moves.get(i)
+            if cell is not None:
+                direction = grid.step_directions.get(cell - snakes[i].head_cell)
+                if direction is not None:
+                    snakes[i].turn(direction)
+
+        # Where every head goes, which tails move off this tick and which heads meet
+        moving = {}
+        targets = {}
+        heads = {}
+        vacating = set()
+        for i in live:
+            snake = snakes[i]
+            target = moving[i] = snake.head_cell + grid.direction_steps[snake.direction]
+            targets.setdefault(target, []).append(i)
+            heads[snake.head_cell] = i
+            if snake.size >= snake.length:
+                vacating.add(snake.tail_cell)
+
+        # Two snakes swapping cells run into each other head first. Settle them
+        # before the occupancy check, which would see the other head as body.
+        dying = {}
+        swapped = set()
+        for i in live:
+            other = heads.get(moving[i])
+            if other is not None and i < other and moving[other] == snakes[i].head_cell:
+                swapped.update((i, other))
+                head_on(snakes, [i, other], dying)
+
+        for target, contenders in targets.items():
+            contenders = [i for i in contenders if i not in swapped]
+            if not contenders:
+                continue
+            count = occupancy[target]
+            if count == WALL:
+                for i in contenders:
+                    dying[i] = 'wall'
+                continue
+            if count - (target in vacating) > 0:
+                for i in contenders:
+                    dying[i] = 'body'
+                continue
+            if len(contenders) > 1:
+                head_on(snakes, contenders, dying)
+
+        for i in live:
+            if i not in dying:
+                snakes[i].walk()
+        for i, cause in dying.items():
+            snake = snakes[i]
+            for cell in snake.segments():
+                grid.release(cell)
+            alive[i] = False
+            self.deaths[i] = cause
+
+        eaten = 0
+        for i in live:
+            if i in dying:
+                continue
+            snake = snakes[i]
+            for apple in self.apples:
+                if apple.cell == snake.head_cell:
+                    self.scores[i] += 1
+                    snake.grow()
+                    eaten += 1
+                    if not (apple.move() and self.place(apple)):
+                        self.apples.remove(apple)
+                    break
+
+        if self.respawn:
+            for i in dying:
+                if self.spawn(snakes[i]) is not None:
+                    alive[i] = True
+        self.steps += 1
+        if not any(alive) or (self.max_steps is not None and self.steps >= self.max_steps):
+            self.done = True
+        return eaten, dying
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless multi-snake arena and report its tick rate")
+    parser.add_argument('--snakes', type=int, default=24)
+    parser.add_argument('--apples', type=int, default=8)
+    parser.add_argument('--width', type=int, default=80)
+    parser.add_argument('--height', type=int, default=60)
+    parser.add_argument('--strategy', default="A*", choices=ARENA_STRATEGIES)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--ticks', type=int, default=2000, help="ticks to run (snakes respawn when they die)")
+    parser.add_argument('--workers', type=int, default=None, help="planning processes (0 plans inline; default: all cores)")
+    parser.add_argument('--tick-budget', type=float, default=None,
+                        help="milliseconds for all the plans of one tick before the greedy step is used")
+    parser.add_argument('--plan-budget', type=int, default=2000, help="node expansions per Anytime search")
+    args = parser.parse_args()
+    if args.plan_budget < 1:
+        parser.error("--plan-budget must be at least 1")
+    if grid_size_error(args.width, args.height, cycle=False):
+        parser.error(grid_size_error(args.width, args.height, cycle=False))
+
+    workers = os.cpu_count() if args.workers is None else args.workers
+    tick_budget = args.tick_budget / 1000 if args.tick_budget is not None else None
+    with Arena(args.snakes, args.apples, args.width, args.height, args.strategy, args.seed, args.ticks, workers,
+               tick_budget, args.plan_budget, respawn=True) as arena:
+        start = time.perf_counter()
+        deaths = {}
+        while not arena.done:
+            _, dying = arena.step()
+            for cause in dying.values():
+                deaths[cause] = deaths.get(cause, 0) + 1
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.snakes} snakes, {args.apples} apples on {args.width}x{args.height}, {args.strategy}, "
+          f"{workers or 'no'} workers: {arena.steps / elapsed:,.1f} ticks/s "
+          f"({1000 * elapsed / arena.steps:.2f}ms a tick)")
+    print(f"apples eaten {sum(arena.scores)}, deaths "
+          + (', '.join(f"{cause}={n}" for cause, n in sorted(deaths.items())) or 'none'))
+    print(f"plans {arena.plans}, missed the tick budget {arena.misses}, fallback moves {arena.fallbacks}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import time
+
+import numpy as np
+
+from engine import GRID_WIDTH, GRID_HEIGHT, SnakeEnv, grid_size_error
+from stats import StatsStore
+
+# Direction codes used by the batched engine
+LEFT, RIGHT, UP, DOWN = 0, 1, 2, 3
+DIRECTIONS = ('left', 'right', 'up', 'down')
+DX = np.array([-1, 1, 0, 0], dtype=np.int32)
+DY = np.array([0, 0, -1, 1], dtype=np.int32)
+OPPOSITE = np.array([RIGHT, LEFT, DOWN, UP], dtype=np.int8)
+
+DEATH_CAUSES = (None, 'wall', 'self', 'board_full')
+
+# N games held as flat arrays of cell indices (cell = y * width + x). Each body is
+# a ring buffer sized to the grid: body[g, head_ptr[g]] is the head and the tail
+# sits body_len[g] - 1 slots behind it.
+class BatchSnakeEnv:
+    def __init__(self, num_games, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        self.num_games = num_games
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.rng = np.random.default_rng(seed)
+        self.games = np.arange(num_games)
+
+        self.occupancy = np.zeros((num_games, self.cells), dtype=np.uint8)
+        self.body = np.zeros((num_games, self.cells), dtype=np.int32)
+        self.head_ptr = np.zeros(num_games, dtype=np.int32)
+        self.body_len = np.zeros(num_games, dtype=np.int32)
+        self.length = np.zeros(num_games, dtype=np.int32)
+        self.head = np.zeros(num_games, dtype=np.int32)
+        self.direction = np.zeros(num_games, dtype=np.int8)
+        self.apple = np.zeros(num_games, dtype=np.int32)
+        self.score = np.zeros(num_games, dtype=np.int32)
+        self.steps = np.zeros(num_games, dtype=np.int32)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.death_cause = np.zeros(num_games, dtype=np.int8)
+        self.reset()
+
+    def reset(self, mask=None):
+        idx = self.games if mask is None else np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        # Same start as engine.Snake: cell (2, 2), heading down, length 1
+        start = 2 * self.width + 2
+        self.occupancy[idx] = 0
+        self.occupancy[idx, start] = 1
+        self.body[idx, 0] = start
+        self.head_ptr[idx] = 0
+        self.body_len[idx] = 1
+        self.length[idx] = 1
+        self.head[idx] = start
+        self.direction[idx] = DOWN
+        self.score[idx] = 0
+        self.steps[idx] = 0
+        self.done[idx] = False
+        self.death_cause[idx] = 0
+        self.spawn_apples(idx)
+
+    def spawn_apples(self, idx):
+        if idx.size == 0:
+            return
+        # Uniform over the free cells of each game: the largest random key wins
+        free = self.occupancy[idx] == 0
+        keys = np.where(free, self.rng.random(free.shape, dtype=np.float32), -1.0)
+        self.apple[idx] = np.argmax(keys, axis=1)
+        full = idx[~free.any(axis=1)]
+        self.done[full] = True
+        self.death_cause[full] = 3
+
+    def greedy_actions(self):
+        x = self.head % self.width
+        y = self.head // self.width
+        apple_x = self.apple % self.width
+        apple_y = self.apple // self.width
+
+        nx = x[:, None] + DX[None, :]
+        ny = y[:, None] + DY[None, :]
+        inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+        cell = np.where(inside, ny * self.width + nx, 0)
+        free = inside & (self.occupancy[self.games[:, None], cell] == 0)
+        free &= np.arange(4)[None, :] != OPPOSITE[self.direction][:, None]
+
+        dist = np.abs(nx - apple_x[:, None]) + np.abs(ny - apple_y[:, None])
+        dist = np.where(free, dist, self.cells * 2)
+        return np.argmin(dist, axis=1).astype(np.int8)
+
+    def step(self, actions=None):
+        if actions is None:
+            actions = self.greedy_actions()
+        actions = np.asarray(actions, dtype=np.int8)
+
+        alive = ~self.done
+        turn = alive & (actions != OPPOSITE[self.direction])
+        self.direction[turn] = actions[turn]
+
+        x = self.head % self.width + DX[self.direction]
+        y = self.head // self.width + DY[self.direction]
+        hit_wall = alive & ((x < 0) | (x >= self.width) | (y < 0) | (y >= self.height))
+        moving = alive & ~hit_wall
+        new_head = np.where(moving, y * self.width + x, self.head)
+
+        # The tail leaves its cell before the head lands, as in Snake.walk()
+        pops = moving & (self.body_len >= self.length)
+        g = self.games[pops]
+        tail = self.body[g, (self.head_ptr[g] - self.body_len[g] + 1) % self.cells]
+        self.occupancy[g, tail] = 0
+        self.body_len[g] -= 1
+
+        hit_self = moving & (self.occupancy[self.games, new_head] != 0)
+        moving &= ~hit_self
+
+        g = self.games[moving]
+        self.head_ptr[g] = (self.head_ptr[g] + 1) % self.cells
+        self.body[g, self.head_ptr[g]] = new_head[g]
+        self.occupancy[g, new_head[g]] = 1
+        self.body_len[g] += 1
+        self.head[g] = new_head[g]
+        self.steps[alive] += 1
+
+        self.death_cause[hit_wall] = 1
+        self.death_cause[hit_self] = 2
+        self.done |= hit_wall | hit_self
+
+        ate = moving & (new_head == self.apple)
+        self.score[ate] += 1
+        self.length[ate] += 1
+        self.spawn_apples(self.games[ate])
+
+        finished = alive & self.done
+        return ate, finished
+
+def benchmark_batch(num_games, steps, width, height, seed, store=None):
+    env = BatchSnakeEnv(num_games, width, height, seed)
+    episodes = 0
+    total_score = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, finished = env.step()
+        if finished.any():
+            episodes += int(finished.sum())
+            total_score += int(env.score[finished].sum())
+            if store is not None:
+                g = env.games[finished]
+                store.record_runs(zip(env.score[g].tolist(), env.length[g].tolist(), env.steps[g].tolist(),
+                                      ["greedy"] * len(g), [DEATH_CAUSES[c] for c in env.death_cause[g]],
+                                      [None] * len(g), [None] * len(g)))
+            env.reset(finished)
+    elapsed = time.perf_counter() - start
+    return num_games * steps / elapsed, episodes, total_score
+
+def benchmark_single(seconds):
+    env = SnakeEnv()
+    ticks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        env.step()
+        ticks += 1
+        if env.done:
+            env.reset()
+    return ticks / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Step thousands of snake games at once with NumPy")
+    parser.add_argument('--games', type=int, default=4096)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--width', type=int, default=GRID_WIDTH)
+    parser.add_argument('--height', type=int, default=GRID_HEIGHT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stats', help="record every finished episode in this SQLite statistics store")
+    parser.add_argument('--baseline-seconds', type=float, default=2.0,
+                        help="time spent measuring single-game SnakeEnv throughput (0 to skip)")
+    args = parser.parse_args()
+    # Batched games steer greedily with no Hamiltonian fallback, so odd boards are fine
+    error = grid_size_error(args.width, args.height, cycle=False)
+    if error:
+        parser.error(error)
+
+    store = StatsStore(args.stats) if args.stats else None
+    rate, episodes, total_score = benchmark_batch(args.games, args.steps, args.width, args.height, args.seed, store)
+    if store is not None:
+        store.close()
+    print(f"batch: {args.games} games x {args.steps} steps on {args.width}x{args.height}: {rate:,.0f} game-ticks/s")
+    if episodes:
+        print(f"       {episodes} finished episodes, mean score {total_score / episodes:.2f}")
+    if args.baseline_seconds > 0:
+        single = benchmark_single(args.baseline_seconds)
+        print(f"single SnakeEnv: {single:,.0f} ticks/s ({rate / single:.1f}x)")
+
+if __name__ == '__main__':
+    main()
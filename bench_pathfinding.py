@@ -0,0 +1,226 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from engine import AnytimeSearch, Grid, astar, bfs, grid_size_error, hamiltonian_cycle, hamiltonian_step
+
+GRID_SIZES = [(25, 12), (50, 24), (100, 48)]
+LENGTH_FRACTIONS = [0.05, 0.25, 0.5, 0.75]
+APPLE_MODES = ['random', 'far', 'unreachable']
+LARGE_GRID_CELLS = 100000  # boards past this get fewer timed calls by default
+
+# Boards are generated as Grid cell ids, the body head first like Snake.body
+
+def coiled_body(grid, length, rng):
+    # A run of consecutive cells along the Hamiltonian cycle, which is how long AI
+    # snakes tend to end up coiled
+    cycle = hamiltonian_cycle(grid.width, grid.height)[0]
+    start = rng.randrange(len(cycle) - length + 1)
+    return cycle[start:start + length][::-1]
+
+def walled_body(grid, length):
+    # Tail just left of a full column wall, head out on the right side. The tail
+    # cell is left of the wall so BFS (which ignores the tail) can't slip through.
+    width, height = grid.width, grid.height
+    wall_x = width // 2
+    cells = [grid.cell(wall_x - 1, 0)] + [grid.cell(wall_x, y) for y in range(height)]
+    for x in range(wall_x + 1, width):
+        column = range(height - 1, -1, -1) if (x - wall_x) % 2 == 1 else range(height)
+        cells.extend(grid.cell(x, y) for y in column)
+    right_side = width * height - (wall_x + 1) * height
+    cells = cells[:max(height + 2, min(length, height + 1 + right_side // 2))]
+    cells.reverse()
+    return cells
+
+def make_board(grid, length, apple_mode, rng):
+    width, height = grid.width, grid.height
+    if apple_mode == 'unreachable':
+        body = walled_body(grid, length)
+        apple = grid.cell(rng.randrange(0, width // 2 - 1), rng.randrange(1, height))
+        return body, apple
+
+    body = coiled_body(grid, length, rng)
+    occupied = set(body)
+    free = [cell for y in range(height) for cell in range(grid.cell(0, y), grid.cell(width, y))
+            if cell not in occupied]
+    if apple_mode == 'far':
+        head_x, head_y = grid.xy(body[0])
+
+        def distance(cell):
+            x, y = grid.xy(cell)
+            return abs(x - head_x) + abs(y - head_y)
+        apple = max(free, key=distance)
+    else:
+        apple = rng.choice(free)
+    return body, apple
+
+def parse_grid(text):
+    try:
+        width, height = (int(side) for side in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, not {text!r}")
+    error = grid_size_error(width, height)
+    if error:
+        raise argparse.ArgumentTypeError(error)
+    return width, height
+
+def load_board(grid, body):
+    # One Grid per grid size, reset in place for every board: a 1000x1000 Grid
+    # is 21MB, too much to keep one per board and function
+    grid.clear()
+    for cell in body:
+        grid.occupy(cell)
+
+# Each runner prepares a board once (outside the timed region, the game keeps this
+# state up to date incrementally) and returns the call to time.
+
+def fallback_runner(width, height):
+    order = hamiltonian_cycle(width, height)[1]
+
+    def prepare(grid, body, apple):
+        head, tail = body[0], body[-1]
+        return lambda: hamiltonian_step(grid, order, head, tail)
+    return prepare
+
+def astar_runner(width, height):
+    def prepare(grid, body, apple):
+        head = body[0]
+        return lambda: astar(grid, head, apple)
+    return prepare
+
+def bfs_runner(width, height):
+    def prepare(grid, body, apple):
+        head, tail = body[0], body[-1]
+        return lambda: bfs(grid, head, apple, tail)
+    return prepare
+
+def anytime_runner(width, height, budget):
+    search = AnytimeSearch(budget)
+
+    def prepare(grid, body, apple):
+        head, tail = body[0], body[-1]
+        return lambda: search.search(grid, head, apple, tail)
+    return prepare
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def measure(run, repeat, timings, peaks):
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        run()
+        timings.append(time.perf_counter_ns() - start)
+
+    # Allocations are measured in a separate call, tracemalloc slows every call down
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    run()
+    peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+def summarize(timings, peaks):
+    timings.sort()
+    return {
+        'calls': len(timings),
+        'mean_us': sum(timings) / len(timings) / 1000,
+        'p50_us': percentile(timings, 0.50) / 1000,
+        'p90_us': percentile(timings, 0.90) / 1000,
+        'p99_us': percentile(timings, 0.99) / 1000,
+        'max_us': timings[-1] / 1000,
+        'alloc_peak_bytes_mean': sum(peaks) / len(peaks),
+        'alloc_peak_bytes_max': max(peaks),
+    }
+
+def case_size(width, height, boards_per_case, repeat):
+    # A single BFS can take a second on the biggest boards, so unless told
+    # otherwise they get a couple of boards timed once each
+    if width * height > LARGE_GRID_CELLS:
+        return boards_per_case or 2, repeat or 1
+    return boards_per_case or 20, repeat or 5
+
+def run_suite(grid_sizes, fractions, apple_modes, boards_per_case=None, repeat=None, seed=0, plan_budget=2000):
+    results = []
+    for width, height in grid_sizes:
+        grid = Grid(width, height)
+        grid_bytes = grid.nbytes()
+        boards, calls = case_size(width, height, boards_per_case, repeat)
+        functions = {
+            'astar': astar_runner(width, height),
+            'bfs': bfs_runner(width, height),
+            'anytime': anytime_runner(width, height, plan_budget),
+            'hamiltonian_fallback': fallback_runner(width, height),
+        }
+        for fraction in fractions:
+            length = max(1, int(width * height * fraction))
+            for apple_mode in apple_modes:
+                rng = random.Random(f"{seed}:{width}x{height}:{length}:{apple_mode}")
+                samples = {name: ([], []) for name in functions}
+                for _ in range(boards):
+                    body, apple = make_board(grid, length, apple_mode, rng)
+                    load_board(grid, body)
+                    for name, prepare in functions.items():
+                        measure(prepare(grid, body, apple), calls, *samples[name])
+                for name in functions:
+                    results.append(dict({
+                        'function': name,
+                        'grid': f"{width}x{height}",
+                        'grid_bytes_per_cell': grid_bytes / (width * height),
+                        'length': len(body),
+                        'apple': apple_mode,
+                    }, **summarize(*samples[name])))
+    return results
+
+def print_table(results):
+    print(f"{'function':<21} {'grid':>9} {'B/cell':>6} {'length':>6} {'apple':>11} {'p50 us':>9} {'p90 us':>9} "
+          f"{'p99 us':>9} {'max us':>9} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r['function']:<21} {r['grid']:>9} {r['grid_bytes_per_cell']:>6.1f} {r['length']:>6} {r['apple']:>11} "
+              f"{r['p50_us']:>9.1f} {r['p90_us']:>9.1f} {r['p99_us']:>9.1f} {r['max_us']:>9.1f} "
+              f"{r['alloc_peak_bytes_max'] / 1024:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time astar(), bfs() and the Hamiltonian fallback on generated boards")
+    parser.add_argument('--boards', type=int, help="boards generated per case (default 20, 2 on big grids)")
+    parser.add_argument('--repeat', type=int, help="timed calls per board (default 5, 1 on big grids)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quick', action='store_true', help="only the default 25x12 grid")
+    parser.add_argument('--grid', type=parse_grid, action='append',
+                        help="grid size to run instead of the defaults, e.g. 1000x1000 (repeatable)")
+    parser.add_argument('--json', help="write results to this file ('-' for stdout)")
+    parser.add_argument('--plan-budget', type=int, default=2000, help="node expansions per anytime search")
+    args = parser.parse_args()
+    if args.plan_budget < 1:
+        parser.error("--plan-budget must be at least 1")
+    if args.boards is not None and args.boards < 1:
+        parser.error("--boards must be at least 1")
+    if args.repeat is not None and args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    grid_sizes = args.grid or (GRID_SIZES[:1] if args.quick else GRID_SIZES)
+    results = run_suite(grid_sizes, LENGTH_FRACTIONS, APPLE_MODES, args.boards, args.repeat, args.seed, args.plan_budget)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'boards': args.boards,
+        'repeat': args.repeat,
+        'plan_budget': args.plan_budget,
+        'results': results,
+    }
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(results)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
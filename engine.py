@@ -0,0 +1,846 @@
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+import heapq
+
+# Constants
+SIZE = 40
+GRID_WIDTH = 25
+GRID_HEIGHT = 12
+MAX_GRID_SIZE = 1000  # cells along either side; a 1000x1000 Grid takes ~21MB
+STRATEGIES = ("A*", "BFS", "Anytime", "Safe", "Hamiltonian")
+
+# Occupancy grid
+
+WALL = 255
+
+def grid_size_error(width, height, cycle=True):
+    # Why a game can't run on this board, or None if it can. SnakeEnv's
+    # Hamiltonian fallback needs a closed cycle, and there is none with an odd
+    # number of cells; pass cycle=False for games that don't use one.
+    if not (3 <= width <= MAX_GRID_SIZE and 3 <= height <= MAX_GRID_SIZE):
+        return f"grid must be between 3x3 and {MAX_GRID_SIZE}x{MAX_GRID_SIZE}, not {width}x{height}"
+    if cycle and width % 2 and height % 2:
+        return f"a {width}x{height} grid has an odd number of cells; make the width or the height even"
+    return None
+
+# Flat cell-indexed board with a one-cell wall border, so the neighbours of any
+# cell are just cell -/+ 1 and cell -/+ stride with no bounds checks. occupancy
+# counts snake segments per cell. parent/dist/seen are reused by every search;
+# seen holds a per-search stamp so nothing has to be cleared between calls.
+# free lists every empty cell (free_pos[cell] is its slot, -1 when occupied) and
+# is kept in step by occupy()/release() with swap-removes. expanded counts the
+# nodes every search on this grid has expanded. Every per-cell field is a flat
+# C array, 21 bytes a cell in all (see nbytes()).
+class Grid:
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        size = self.stride * (height + 2)
+        self.occupancy = bytearray(size)
+        self.parent = array('i', [-1]) * size
+        self.dist = array('i', [0]) * size
+        self.seen = array('I', [0]) * size
+        self.stamp = 0
+        self.expanded = 0
+        self.step_directions = {-1: 'left', 1: 'right', -self.stride: 'up', self.stride: 'down'}
+        self.direction_steps = {direction: step for step, direction in self.step_directions.items()}
+        self.free = array('i')
+        self.free_pos = array('i', [-1]) * size
+        self.steps = (-1, 1, -self.stride, self.stride)
+        self.clear()
+
+    def clear(self):
+        # A row at a time, so a reset costs O(height) Python steps however wide the board is
+        occupancy, free_pos = self.occupancy, self.free_pos
+        stride, width = self.stride, self.width
+        occupancy[:] = bytes([WALL]) * len(occupancy)
+        free_pos[:] = array('i', [-1]) * len(free_pos)
+        free = self.free = array('i')
+        for row in range(1, self.height + 1):
+            start = row * stride + 1
+            occupancy[start:start + width] = bytes(width)
+            free_pos[start:start + width] = array('i', range(len(free), len(free) + width))
+            free.extend(range(start, start + width))
+
+    def nbytes(self):
+        arrays = (self.parent, self.dist, self.seen, self.free, self.free_pos)
+        return len(self.occupancy) + sum(a.itemsize * len(a) for a in arrays)
+
+    def cell(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    def xy(self, cell):
+        y, x = divmod(cell, self.stride)
+        return x - 1, y - 1
+
+    def occupy(self, cell):
+        count = self.occupancy[cell]
+        if count == WALL:
+            return
+        if count == 0:
+            free, free_pos = self.free, self.free_pos
+            i = free_pos[cell]
+            last = free.pop()
+            if last != cell:
+                free[i] = last
+                free_pos[last] = i
+            free_pos[cell] = -1
+        self.occupancy[cell] = count + 1
+
+    def release(self, cell):
+        count = self.occupancy[cell]
+        if count == WALL:
+            return
+        self.occupancy[cell] = count - 1
+        if count == 1:
+            self.free_pos[cell] = len(self.free)
+            self.free.append(cell)
+
+    def next_stamp(self):
+        self.stamp += 1
+        if self.stamp > 0xFFFFFFFF:
+            self.seen = array('I', [0]) * len(self.seen)
+            self.stamp = 1
+        return self.stamp
+
+    def trace(self, start, goal):
+        parent = self.parent
+        path = []
+        current = goal
+        while current != start:
+            path.append(current)
+            current = parent[current]
+        path.reverse()
+        return path
+
+# Pathfinding functions. Both take and return grid cells.
+
+def astar(grid, start, goal):
+    occupancy, parent, g_score, seen = grid.occupancy, grid.parent, grid.dist, grid.seen
+    stamp = grid.next_stamp()
+    stride = grid.stride
+    goal_y, goal_x = divmod(goal, stride)
+    start_y, start_x = divmod(start, stride)
+
+    seen[start] = stamp
+    g_score[start] = 0
+    h = abs(start_x - goal_x) + abs(start_y - goal_y)
+    # Ties on f go to the smaller h, i.e. the node closer to the apple
+    open_set = [(h, h, start)]
+    expanded = 0
+
+    while open_set:
+        f_score, h, current = heapq.heappop(open_set)
+        if current == goal:
+            grid.expanded += expanded
+            return grid.trace(start, goal)
+        # Manhattan distance is consistent, so a stale heap entry can simply be skipped
+        cost = f_score - h
+        if cost > g_score[current]:
+            continue
+        expanded += 1
+
+        tentative_g = cost + 1
+        for step in grid.steps:
+            neighbor = current + step
+            if occupancy[neighbor]:
+                continue
+            if seen[neighbor] != stamp or tentative_g < g_score[neighbor]:
+                seen[neighbor] = stamp
+                g_score[neighbor] = tentative_g
+                parent[neighbor] = current
+                y, x = divmod(neighbor, stride)
+                h = abs(x - goal_x) + abs(y - goal_y)
+                heapq.heappush(open_set, (tentative_g + h, h, neighbor))
+    grid.expanded += expanded
+    return []
+
+def bfs(grid, start, goal, tail=None):
+    # The tail cell counts as free: it moves out of the way on the next step
+    occupancy, parent, seen = grid.occupancy, grid.parent, grid.seen
+    stamp = grid.next_stamp()
+    seen[start] = stamp
+    queue = deque([start])
+    expanded = 0
+
+    while queue:
+        current = queue.popleft()
+        if current == goal:
+            grid.expanded += expanded
+            return grid.trace(start, goal)
+        expanded += 1
+
+        for step in grid.steps:
+            neighbor = current + step
+            if seen[neighbor] != stamp and (not occupancy[neighbor] or neighbor == tail):
+                seen[neighbor] = stamp
+                parent[neighbor] = current
+                queue.append(neighbor)
+    grid.expanded += expanded
+    return []
+
+# A* with a per-call budget of node expansions and, optionally, seconds. When the
+# budget runs out before the apple is reached it returns the route to one of the
+# expanded cells nearest the apple, preferring one from which the tail can still
+# be reached, so the worst-case cost of a tick is bounded by the budget rather
+# than the board size. used/partial keep track of how much of it was spent.
+class AnytimeSearch:
+    CANDIDATES = 4  # cells near the apple tried for a way back to the tail
+    CHECK_EVERY = 64  # expansions between clock reads when a time budget is set
+
+    def __init__(self, budget=2000, time_budget=None):
+        if budget < 1:
+            raise ValueError(f"an anytime search needs a budget of at least 1 node, not {budget}")
+        self.budget = budget
+        self.time_budget = time_budget
+        self.searches = 0
+        self.partial = 0
+        self.last_used = 0
+        self.total_used = 0
+
+    def mean_used(self):
+        # Fraction of the node budget spent per search
+        return self.total_used / (self.searches * self.budget) if self.searches else 0.0
+
+    def search(self, grid, start, goal, tail=None):
+        occupancy, parent, g_score, seen = grid.occupancy, grid.parent, grid.dist, grid.seen
+        stamp = grid.next_stamp()
+        stride = grid.stride
+        goal_y, goal_x = divmod(goal, stride)
+        start_y, start_x = divmod(start, stride)
+        deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+
+        seen[start] = stamp
+        g_score[start] = 0
+        h = abs(start_x - goal_x) + abs(start_y - goal_y)
+        open_set = [(h, h, start)]
+        expanded = []
+        path = None
+        out_of_time = False
+
+        while open_set and len(expanded) < self.budget:
+            f_score, h, current = heapq.heappop(open_set)
+            if current == goal:
+                path = grid.trace(start, goal)
+                break
+            cost = f_score - h
+            if cost > g_score[current]:
+                continue
+            if current != start:
+                expanded.append((h, -cost, current))
+            if deadline is not None and len(expanded) % self.CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                out_of_time = True
+                break
+
+            tentative_g = cost + 1
+            for step in grid.steps:
+                neighbor = current + step
+                if occupancy[neighbor]:
+                    continue
+                if seen[neighbor] != stamp or tentative_g < g_score[neighbor]:
+                    seen[neighbor] = stamp
+                    g_score[neighbor] = tentative_g
+                    parent[neighbor] = current
+                    y, x = divmod(neighbor, stride)
+                    h = abs(x - goal_x) + abs(y - goal_y)
+                    heapq.heappush(open_set, (tentative_g + h, h, neighbor))
+
+        used = len(expanded)
+        # An exhausted open set means the apple is cut off, not that time ran out;
+        # that is left to the Hamiltonian fallback like any failed search
+        if path is None and expanded and (used >= self.budget or out_of_time):
+            # Nearest the apple first, then the longest route there. Routes are
+            # traced before the tail checks below overwrite parent[].
+            candidates = [(cell, grid.trace(start, cell)) for _, _, cell in heapq.nsmallest(self.CANDIDATES, expanded)]
+            path = candidates[0][1]
+            if tail is not None:
+                # Each check may visit as many cells as were expanded, at most
+                # doubling the cost of a call
+                for cell, route in candidates:
+                    reached, visited = self.reaches(grid, cell, tail, max(used, 1))
+                    used += visited
+                    if reached:
+                        path = route
+                        break
+            self.partial += 1
+
+        self.searches += 1
+        self.last_used = used
+        self.total_used += used
+        grid.expanded += used
+        return path or []
+
+    def reaches(self, grid, start, goal, limit):
+        # Bounded flood fill from start; a region too big to exhaust counts as open
+        occupancy, seen = grid.occupancy, grid.seen
+        stamp = grid.next_stamp()
+        seen[start] = stamp
+        queue = deque([start])
+        visited = 0
+        while queue and visited < limit:
+            current = queue.popleft()
+            visited += 1
+            for step in grid.steps:
+                neighbor = current + step
+                if neighbor == goal:
+                    return True, visited
+                if seen[neighbor] != stamp and not occupancy[neighbor]:
+                    seen[neighbor] = stamp
+                    queue.append(neighbor)
+        return bool(queue), visited
+
+# Keeps the last planned route so the AI only searches again when the apple moves,
+# the strategy changes, the snake leaves the route or something now blocks it.
+class PathCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        self.route = []
+        self.index = 0
+        self.goal = None
+        self.strategy = None
+
+    def lookup(self, grid, head, goal, strategy, tail):
+        route = self.route
+        i = self.index
+        if route and goal == self.goal and strategy == self.strategy:
+            if i + 1 < len(route) and route[i + 1] == head:
+                i += 1
+            if route[i] == head and i + 1 < len(route):
+                path = route[i + 1:]
+                occupancy = grid.occupancy
+                for cell in path:
+                    if occupancy[cell] and cell != tail:
+                        break
+                else:
+                    self.index = i
+                    self.hits += 1
+                    return path
+        self.misses += 1
+        return None
+
+    def store(self, head, goal, strategy, path):
+        self.route = [head] + path if path else []
+        self.index = 0
+        self.goal = goal
+        self.strategy = strategy
+
+# Hamiltonian cycle
+
+CYCLE_MAGIC = b'HCY1'
+CYCLE_HEADER = struct.Struct('<4sIII')
+
+_cycles = {}
+
+def closed_cycle_xy(width, height):
+    # Along the top row, boustrophedon back through columns 1.. of the remaining
+    # rows, then up column 0 to the start. Needs an even number of rows, so odd
+    # heights are built transposed.
+    if width < 2 or height < 2 or width * height % 2:
+        raise ValueError(f"no closed Hamiltonian cycle on a {width}x{height} grid")
+    if height % 2:
+        return [(x, y) for y, x in closed_cycle_xy(height, width)]
+
+    cycle = [(x, 0) for x in range(width)]
+    for y in range(1, height):
+        xs = range(width - 1, 0, -1) if y % 2 else range(1, width)
+        cycle.extend((x, y) for x in xs)
+    cycle.extend((0, y) for y in range(height - 1, 0, -1))
+    return cycle
+
+def cycle_cache_path(cache_dir, width, height):
+    return os.path.join(cache_dir, f"hamiltonian_{width}x{height}.bin")
+
+def save_cycle(path, width, height, cycle, order):
+    blobs = []
+    for values in (cycle, order):
+        values = array('i', values)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        blobs.append(zlib.compress(values.tobytes()))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(CYCLE_HEADER.pack(CYCLE_MAGIC, width, height, len(blobs[0])))
+        f.write(blobs[0])
+        f.write(blobs[1])
+    os.replace(tmp_path, path)
+
+def load_cycle(path, width, height):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, file_width, file_height, cycle_bytes = CYCLE_HEADER.unpack_from(data)
+        if magic != CYCLE_MAGIC or (file_width, file_height) != (width, height):
+            return None
+        start = CYCLE_HEADER.size
+        cycle = array('i', zlib.decompress(data[start:start + cycle_bytes]))
+        order = array('i', zlib.decompress(data[start + cycle_bytes:]))
+    except (OSError, struct.error, zlib.error, ValueError):
+        return None
+
+    if sys.byteorder == 'big':
+        cycle.byteswap()
+        order.byteswap()
+    if len(cycle) != width * height or len(order) != (width + 2) * (height + 2):
+        return None
+    return cycle, order
+
+def hamiltonian_cycle(width=GRID_WIDTH, height=GRID_HEIGHT, cache_dir=None):
+    # Returns (cycle, order) in Grid cell ids: the cells in cycle order, and each
+    # cell's position on the cycle (-1 for the wall border). Built once per grid
+    # size per process, and read from / written to cache_dir when one is given.
+    key = (width, height)
+    if key in _cycles:
+        return _cycles[key]
+
+    path = cycle_cache_path(cache_dir, width, height) if cache_dir else None
+    cached = load_cycle(path, width, height) if path else None
+    if cached is None:
+        stride = width + 2  # same layout as Grid
+        cycle = array('i', [(y + 1) * stride + x + 1 for x, y in closed_cycle_xy(width, height)])
+        order = array('i', [-1]) * (stride * (height + 2))
+        for i, cell in enumerate(cycle):
+            order[cell] = i
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            save_cycle(path, width, height, cycle, order)
+        cached = (cycle, order)
+
+    _cycles[key] = cached
+    return cached
+
+def hamiltonian_step(grid, order, head, tail=None, behind=None):
+    # Of the cells the head can move into, take the one furthest back along the
+    # cycle from the head, i.e. the next cycle cell whenever that one is open.
+    # behind is the cell the head came from, which Snake.turn() won't reverse into.
+    occupancy = grid.occupancy
+    cycle_len = grid.width * grid.height
+    position = order[head]
+    best = None
+    best_ahead = cycle_len
+    for step in grid.steps:
+        cell = head + step
+        if (occupancy[cell] and cell != tail) or cell == behind:
+            continue
+        ahead = (order[cell] - position) % cycle_len
+        if ahead < best_ahead:
+            best = cell
+            best_ahead = ahead
+    return best
+
+def find_path(grid, path_cache, strategy, head, goal, tail, anytime=None):
+    if strategy not in ("A*", "BFS", "Anytime"):
+        return []
+
+    path = path_cache.lookup(grid, head, goal, strategy, tail)
+    if path is not None:
+        return path
+
+    if strategy == "A*":
+        path = astar(grid, head, goal)
+    elif strategy == "Anytime":
+        path = (anytime or AnytimeSearch()).search(grid, head, goal, tail)
+    else:
+        path = bfs(grid, head, goal, tail)
+    path_cache.store(head, goal, strategy, path)
+    return path
+
+# Lookahead state
+
+# Just what a lookahead needs to play a move forward: occupancy, the body as
+# cell ids (head first), length and the apple cell. clone() is two C-level
+# copies, so a planner can try thousands of futures per tick without touching
+# the live Snake/Apple or anything pygame owns. Searches run on a scratch Grid
+# that is pointed at the state's occupancy, never on the live board.
+class GameState:
+    __slots__ = ('occupancy', 'body', 'length', 'apple', 'scratch')
+
+    def __init__(self, occupancy, body, length, apple, scratch):
+        self.occupancy = occupancy
+        self.body = body
+        self.length = length
+        self.apple = apple
+        self.scratch = scratch
+
+    @classmethod
+    def from_env(cls, env, scratch):
+        return cls(bytearray(env.grid.occupancy), deque(env.snake.body), env.snake.length, env.apple.cell, scratch)
+
+    def clone(self):
+        return GameState(bytearray(self.occupancy), deque(self.body), self.length, self.apple, self.scratch)
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    @property
+    def tail(self):
+        return self.body[-1]
+
+    def search_grid(self):
+        self.scratch.occupancy = self.occupancy
+        return self.scratch
+
+    def advance(self, cell):
+        # Same order as Snake.walk() then SnakeEnv.step(); False if the move kills
+        occupancy = self.occupancy
+        if occupancy[cell] == WALL:
+            return False
+        self.body.appendleft(cell)
+        occupancy[cell] += 1
+        if len(self.body) > self.length:
+            occupancy[self.body.pop()] -= 1
+        if cell == self.apple:
+            self.length += 1
+            self.apple = None
+        return occupancy[cell] == 1
+
+    def tail_reachable(self):
+        if len(self.body) == 1:
+            return True
+        return bool(bfs(self.search_grid(), self.head, self.tail, self.tail))
+
+def safe_path(state):
+    # Take the A* route to the apple only if, once it is eaten, the head can still
+    # get back to the tail; an open route to the tail means the snake can't have
+    # boxed itself in. Otherwise take a step that keeps the tail in reach.
+    path = astar(state.search_grid(), state.head, state.apple)
+    if path:
+        future = state.clone()
+        if all(future.advance(cell) for cell in path) and future.tail_reachable():
+            return path
+
+    grid = state.search_grid()
+    tail = state.tail
+    to_tail = bfs(grid, state.head, tail, tail) if len(state.body) > 1 else []
+    moves = to_tail[:1] + [state.head + step for step in grid.steps]
+    for cell in moves:
+        if state.occupancy[cell] and cell != tail:
+            continue
+        future = state.clone()
+        if future.advance(cell) and future.tail_reachable():
+            return [cell]
+    return []
+
+# The apple is a cell id.
+class Apple:
+    __slots__ = ('rng', 'grid', 'cell')
+
+    def __init__(self, rng=random, grid=None):
+        self.rng = rng
+        self.grid = grid if grid is not None else Grid()
+        self.move()
+
+    def move(self):
+        # Draw any cell and fall back to the free-cell index only if the snake is on it.
+        # Still uniform over free cells, O(1) however full the board is, and the
+        # draws line up across strategies for as long as the first pick is free.
+        grid = self.grid
+        x = self.rng.randint(0, grid.width - 1)
+        y = self.rng.randint(0, grid.height - 1)
+        cell = grid.cell(x, y)
+        if grid.occupancy[cell]:
+            if not grid.free:
+                return False
+            cell = grid.free[self.rng.randrange(len(grid.free))]
+        self.cell = cell
+        return True
+
+# The body is a ring of cell ids preallocated for the whole board: the head is
+# cells[head_ptr] and the tail sits size - 1 slots behind it. One slot more than
+# the board has cells, so walk() can lay the new head before the tail leaves.
+# The ring is 4 bytes a cell whatever the length, and walk() allocates nothing.
+class Snake:
+    __slots__ = ('grid', 'direction', 'length', 'cells', 'head_ptr', 'size', 'head_cell')
+
+    def __init__(self, grid=None, start=None):
+        self.grid = grid if grid is not None else Grid()
+        self.direction = 'down'
+        self.length = 1
+        self.cells = array('i', [0]) * (self.grid.width * self.grid.height + 1)
+        self.reset([start if start is not None else self.grid.cell(2, 2)])
+
+    def reset(self, body, mark=True):
+        # Lay out a body of cell ids, head first, and mark it on the grid unless
+        # the caller sets the occupancy itself
+        self.size = len(body)
+        self.head_ptr = self.size - 1
+        self.cells[:self.size] = array('i', reversed(body))
+        if mark:
+            for cell in body:
+                self.grid.occupy(cell)
+        self.head_cell = body[0]
+
+    @property
+    def tail_cell(self):
+        return self.cells[(self.head_ptr - self.size + 1) % len(self.cells)]
+
+    @property
+    def moving_tail(self):
+        # The tail cell if it moves off this tick, None while the snake is growing.
+        # Only then is it safe for the head to enter.
+        return self.tail_cell if self.size >= self.length else None
+
+    def segments(self):
+        # Cell ids from head to tail
+        cells, capacity = self.cells, len(self.cells)
+        for i in range(self.head_ptr, self.head_ptr - self.size, -1):
+            yield cells[i % capacity]
+
+    @property
+    def behind_cell(self):
+        # The cell straight back from the head. turn() won't reverse into it, even
+        # on a snake of length 1 whose searches see that cell as open.
+        return self.head_cell - self.grid.direction_steps[self.direction]
+
+    @property
+    def body(self):
+        # Cell ids, head first, copied out of the ring in one or two C-level slices
+        cells, head, tail = self.cells, self.head_ptr, self.head_ptr - self.size + 1
+        if tail > 0:
+            return cells[head:tail - 1:-1]
+        if tail == 0:
+            return cells[head::-1]
+        return cells[head::-1] + cells[:tail - 1:-1]
+
+    def move_left(self):
+        if self.direction != 'right':
+            self.direction = 'left'
+
+    def move_right(self):
+        if self.direction != 'left':
+            self.direction = 'right'
+
+    def move_up(self):
+        if self.direction != 'down':
+            self.direction = 'up'
+
+    def move_down(self):
+        if self.direction != 'up':
+            self.direction = 'down'
+
+    def turn(self, direction):
+        if direction == 'left':
+            self.move_left()
+        elif direction == 'right':
+            self.move_right()
+        elif direction == 'up':
+            self.move_up()
+        elif direction == 'down':
+            self.move_down()
+
+    def walk(self):
+        grid = self.grid
+        cells = self.cells
+        head = self.head_cell + grid.direction_steps[self.direction]
+        head_ptr = self.head_ptr + 1
+        if head_ptr == len(cells):
+            head_ptr = 0
+        cells[head_ptr] = head
+        self.head_ptr = head_ptr
+        self.head_cell = head
+        grid.occupy(head)
+        if self.size < self.length:
+            self.size += 1
+        else:
+            grid.release(cells[head_ptr - self.size])
+
+    def grow(self):
+        # The extra segment appears on the next walk(), when the tail isn't popped
+        self.length += 1
+
+    def occupies(self, cell):
+        count = self.grid.occupancy[cell]
+        return 0 < count < WALL
+
+    def check_collision_with_self(self):
+        # The head's cell is counted twice when it ran into the body
+        count = self.grid.occupancy[self.head_cell]
+        return 1 < count < WALL
+
+# Headless game core: everything Game.run() used to do except drawing and input.
+# Game in snake.py subclasses this and overrides new_snake()/new_apple() to hand
+# out drawable pieces.
+class SnakeEnv:
+    def __init__(self, search_strategy="A*", ai_enabled=True, seed=None, max_steps=None, cycle_cache_dir=None,
+                 plan_budget=2000, plan_time_budget=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        error = grid_size_error(width, height)
+        if error:
+            raise ValueError(error)
+        self.search_strategy = search_strategy
+        self.ai_enabled = ai_enabled
+        self.max_steps = max_steps
+        self.cycle_cache_dir = cycle_cache_dir
+        # Every game runs on its own seed, drawn from seeds unless reset() is given
+        # one, so any game can be replayed from its seed and its moves
+        self.seeds = random.Random(seed)
+        self.rng = random.Random()
+        self.recorder = None
+        self.telemetry = None
+        self.plan_ns = 0  # how long the last plan took, kept while telemetry is attached
+        self.grid = Grid(width, height)
+        self.path_cache = PathCache()
+        self.anytime = AnytimeSearch(plan_budget, plan_time_budget)
+        self.lookahead_grid = None
+        self.reset(seed)
+
+    def new_snake(self):
+        return Snake(self.grid)
+
+    def new_apple(self):
+        return Apple(self.rng, self.grid)
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.seeds.getrandbits(64)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.grid.clear()
+        self.path_cache.clear()
+        self.snake = self.new_snake()
+        self.apple = self.new_apple()
+        self.score = 0
+        self.steps = 0
+        self.fallbacks = 0
+        self.done = False
+        self.death_cause = None
+        self.hamiltonian_path, self.hamiltonian_order = hamiltonian_cycle(
+            self.grid.width, self.grid.height, self.cycle_cache_dir)
+        self.hamiltonian_index = self.hamiltonian_order[self.snake.head_cell]
+        if self.recorder is not None:
+            self.recorder.start(self)
+        return self.observe()
+
+    def find_path(self):
+        return find_path(self.grid, self.path_cache, self.search_strategy, self.snake.head_cell, self.apple.cell,
+                         self.snake.moving_tail, self.anytime)
+
+    def hamiltonian_move(self):
+        snake = self.snake
+        return hamiltonian_step(self.grid, self.hamiltonian_order, snake.head_cell, snake.moving_tail,
+                                snake.behind_cell)
+
+    def nodes_expanded(self):
+        lookahead = self.lookahead_grid.expanded if self.lookahead_grid is not None else 0
+        return self.grid.expanded + lookahead
+
+    def plan(self):
+        if self.search_strategy == "Safe":
+            if self.lookahead_grid is None:
+                self.lookahead_grid = Grid(self.grid.width, self.grid.height)
+            path = safe_path(GameState.from_env(self, self.lookahead_grid))
+        else:
+            path = self.find_path()
+        if path and path[0] != self.snake.behind_cell:
+            next_cell = path[0]
+        else:
+            self.fallbacks += 1
+            next_cell = self.hamiltonian_move()
+        if next_cell is None:
+            return None
+        return self.grid.step_directions.get(next_cell - self.snake.head_cell)
+
+    def step(self, direction=None):
+        if direction is None and self.ai_enabled:
+            if self.telemetry is not None:
+                started = time.perf_counter_ns()
+                direction = self.plan()
+                self.plan_ns = time.perf_counter_ns() - started
+            else:
+                direction = self.plan()
+        if direction is not None:
+            self.snake.turn(direction)
+
+        self.snake.walk()
+        self.steps += 1
+        # Where the head sits on the cycle, -1 once it has left the board
+        self.hamiltonian_index = self.hamiltonian_order[self.snake.head_cell]
+        ate = False
+
+        # Check collision with walls
+        head = self.snake.head_cell
+        if self.grid.occupancy[head] == WALL:
+            self.done = True
+            self.death_cause = 'wall'
+
+        # Check collision with self
+        elif self.snake.check_collision_with_self():
+            self.done = True
+            self.death_cause = 'self'
+
+        # Check apple collision
+        elif head == self.apple.cell:
+            self.score += 1
+            self.snake.grow()
+            ate = True
+            if not self.apple.move():
+                self.done = True
+                self.death_cause = 'board_full'
+
+        if not self.done and self.max_steps is not None and self.steps >= self.max_steps:
+            self.done = True
+            self.death_cause = 'timeout'
+
+        if self.recorder is not None:
+            self.recorder.record(self.snake.direction)
+        if self.telemetry is not None:
+            self.telemetry.record(self)
+        return self.observe(body=False), int(ate), self.done, {'death_cause': self.death_cause}
+
+    def restore(self, body, length, direction, apple, rng_state, hamiltonian_index, score, steps, free=None):
+        # Put a live game back into a saved state (body and apple as cell ids, head
+        # first). Apple.move() samples grid.free by position, so an exact restore
+        # also needs the free cells in their saved order.
+        grid = self.grid
+        grid.clear()
+        self.path_cache.clear()
+        snake = self.snake
+        if free is None:
+            snake.reset(body)
+        else:
+            # The saved free list replaces the one occupy() would keep up to date,
+            # so mark the body directly
+            snake.reset(body, mark=False)
+            occupancy, free_pos = grid.occupancy, grid.free_pos
+            for cell in body:
+                occupancy[cell] += 1
+                free_pos[cell] = -1
+            grid.free = array('i', free)
+            for i, cell in enumerate(grid.free):
+                free_pos[cell] = i
+        snake.length = length
+        snake.direction = direction
+        self.apple.cell = apple
+        self.rng.setstate(rng_state)
+        self.hamiltonian_index = hamiltonian_index
+        self.score = score
+        self.steps = steps
+        self.done = False
+        self.death_cause = None
+
+    def observe(self, body=True):
+        # Positions are Grid cell ids; grid.xy() turns one into board coordinates.
+        # The body is a copy of the whole ring, so step() leaves it out.
+        observation = {
+            'head': self.snake.head_cell,
+            'direction': self.snake.direction,
+            'apple': self.apple.cell,
+            'score': self.score,
+            'length': self.snake.length,
+            'steps': self.steps,
+            'done': self.done,
+        }
+        if body:
+            observation['body'] = self.snake.body
+        return observation
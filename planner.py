@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from engine import GameState, Grid, PathCache, find_path, hamiltonian_step, safe_path
+
+def plan_snapshot(grid, path_cache, anytime, strategy, order, head, goal, tail, behind, state=None):
+    # Runs on the worker. Everything it touches belongs to the snapshot, so a late
+    # plan can keep running while the game moves on without it.
+    if state is not None:
+        path = safe_path(state)
+        grid = state.search_grid()
+    else:
+        path = find_path(grid, path_cache, strategy, head, goal, tail, anytime)
+    if path and path[0] != behind:
+        return path[0], False
+    return hamiltonian_step(grid, order, head, tail, behind), True
+
+# Plans the move for the next tick on a worker thread while the current one is
+# drawn. submit() snapshots the board right after a tick; next_direction() collects
+# the plan at the following tick and, if it isn't ready by the deadline, takes the
+# Hamiltonian step from the live board instead and counts a miss.
+class AsyncPlanner:
+    def __init__(self, env, deadline=0.1):
+        self.env = env
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner")
+        self.grid = None
+        self.path_cache = PathCache()
+        self.pending = None
+        self.pending_state = None
+        self.submitted_at = 0
+        self.plans = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.retired_expanded = 0
+
+    def snapshot_grid(self):
+        live = self.env.grid
+        grid = self.grid
+        # A plan that missed its deadline may still be reading the last snapshot
+        late = self.pending is not None and not self.pending.done()
+        if late or grid is None or (grid.width, grid.height) != (live.width, live.height):
+            if grid is not None:
+                self.retired_expanded += grid.expanded
+            grid = self.grid = Grid(live.width, live.height)
+            self.path_cache = PathCache()
+        grid.occupancy[:] = live.occupancy
+        return grid
+
+    def submit(self):
+        env = self.env
+        snake = env.snake
+        grid = self.snapshot_grid()
+        head = snake.head_cell
+        goal = env.apple.cell
+        tail = snake.moving_tail
+        state = GameState.from_env(env, grid) if env.search_strategy == "Safe" else None
+        self.pending = self.executor.submit(plan_snapshot, grid, self.path_cache, env.anytime, env.search_strategy,
+                                            env.hamiltonian_order, head, goal, tail, snake.behind_cell,
+                                            state)
+        self.pending_state = (snake, env.steps)
+        self.submitted_at = time.perf_counter()
+
+    def cancel(self):
+        if self.pending is not None:
+            self.pending.cancel()
+        self.pending = None
+
+    def next_direction(self):
+        env = self.env
+        snake = env.snake
+        pending = self.pending
+        self.pending = None
+        # A plan made before a reset or for an earlier tick is no use now
+        if pending is None or self.pending_state != (snake, env.steps):
+            if pending is not None:
+                pending.cancel()
+            self.submit()
+            pending = self.pending
+            self.pending = None
+
+        self.plans += 1
+        timeout = max(0, self.submitted_at + self.deadline - time.perf_counter())
+        try:
+            cell, from_cycle = pending.result(timeout)
+        except TimeoutError:
+            self.misses += 1
+            cell, from_cycle = env.hamiltonian_move(), True
+            # Keep the late plan around so the next snapshot doesn't reuse its grid
+            self.pending = pending
+        if from_cycle:
+            # Counted on the env too, where telemetry reads it for this game
+            self.fallbacks += 1
+            env.fallbacks += 1
+
+        if cell is None:
+            return snake.direction
+        return env.grid.step_directions.get(cell - snake.head_cell, snake.direction)
+
+    def nodes_expanded(self):
+        return self.retired_expanded + (self.grid.expanded if self.grid is not None else 0)
+
+    def miss_rate(self):
+        return self.misses / self.plans if self.plans else 0.0
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,102 @@
+from time import perf_counter_ns
+
+# Log-linear latency histogram in the style of HdrHistogram: 32 linear
+# sub-buckets per power of two, so every recorded value keeps about 3% precision
+# from 1ns up to minutes, in a fixed 2048-slot list and O(1) per record().
+class LatencyHistogram:
+    SUB_BUCKETS = 32
+
+    def __init__(self):
+        self.counts = [0] * 2048
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, value):
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - 6
+        return shift * cls.SUB_BUCKETS + (value >> shift)
+
+    @classmethod
+    def bucket_value(cls, index):
+        # Lowest value that lands in the bucket
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift = index // cls.SUB_BUCKETS - 1
+        return (index - shift * cls.SUB_BUCKETS) << shift
+
+    def record(self, value):
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0
+        target = max(1, round(fraction * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+# Opt-in timing of each phase of the game loop. start() returns a timestamp and
+# stop() files the elapsed time under a phase; counters are plain tallies.
+# NULL_PROFILER stands in when profiling is off, so the loop calls the same
+# methods either way and pays one no-op call per phase.
+class Profiler:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+
+    def start(self):
+        return perf_counter_ns()
+
+    def stop(self, phase, started):
+        elapsed = perf_counter_ns() - started
+        self.record(phase, elapsed)
+        return elapsed
+
+    def record(self, phase, elapsed):
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = LatencyHistogram()
+        histogram.record(elapsed)
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def summary(self):
+        lines = [f"{'phase':<14} {'calls':>8} {'mean us':>9} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'max us':>9}"]
+        for phase, h in self.histograms.items():
+            lines.append(f"{phase:<14} {h.count:>8} {h.mean() / 1000:>9.1f} {h.percentile(0.50) / 1000:>9.1f} "
+                         f"{h.percentile(0.90) / 1000:>9.1f} {h.percentile(0.99) / 1000:>9.1f} {h.max / 1000:>9.1f}")
+        for name, value in self.counters.items():
+            lines.append(f"{name:<14} {value:>8}")
+        return '\n'.join(lines)
+
+class NullProfiler:
+    def start(self):
+        return 0
+
+    def stop(self, phase, started):
+        return 0
+
+    def record(self, phase, elapsed):
+        pass
+
+    def set(self, name, value):
+        pass
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,272 @@
+import argparse
+import bisect
+import struct
+from array import array
+from itertools import accumulate
+from operator import sub
+
+from engine import GRID_HEIGHT, GRID_WIDTH, STRATEGIES, SnakeEnv, grid_size_error
+
+# Replay file: a fixed header followed by one 2-bit direction code per tick,
+# four ticks to a byte. The seed fixes every apple, so the directions the snake
+# actually moved in are all it takes to play the game again exactly.
+#
+# Version 2 adds a keyframe every keyframe_interval ticks: an index of
+# (tick, offset) pairs after the directions, then the keyframes themselves.
+# Seeking loads the nearest keyframe before the target and simulates at most
+# one interval forward.
+REPLAY_MAGIC = b'SRP1'
+REPLAY_HEADER = struct.Struct('<4sHHQII')  # magic, width, height, seed, ticks, final score
+KEYFRAME_MAGIC = b'SRP2'
+KEYFRAME_HEADER = struct.Struct('<4sHHQIIII')  # ... plus keyframe interval and count
+KEYFRAME_INDEX = struct.Struct('<II')  # tick, offset into the keyframe section
+# steps, score, length, head x, head y, apple x, apple y, direction, hamiltonian index, segments
+KEYFRAME = struct.Struct('<IIIHHHHBII')
+RNG_TAIL = struct.Struct('<?d')  # whether random.gauss() has a value cached, and the value
+DIRECTIONS = ('left', 'right', 'up', 'down')
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+# bytes.translate() tables putting a 2-bit code into each slot of a byte, and
+# taking it back out
+SLOT_SHIFT = [bytes((code & 3) << shift for code in range(256)) for shift in (0, 2, 4, 6)]
+SLOT_CODE = [bytes((byte >> shift) & 3 for byte in range(256)) for shift in (0, 2, 4, 6)]
+
+def pack_directions(codes):
+    # Four codes to a byte, lowest bits first. Every fourth code is shifted into
+    # its slot by a translate table and the slots are ORed together as one big
+    # integer each, so a 400k-segment body doesn't loop in Python.
+    packed = 0
+    for slot, table in enumerate(SLOT_SHIFT):
+        packed |= int.from_bytes(bytes(codes[slot::4]).translate(table), 'little')
+    return packed.to_bytes((len(codes) + 3) // 4, 'little')
+
+def unpack_directions(packed, count):
+    codes = bytearray(len(packed) * 4)
+    for slot, table in enumerate(SLOT_CODE):
+        codes[slot::4] = bytes(packed).translate(table)
+    del codes[count:]
+    return codes
+
+def step_deltas(grid):
+    # Cell id change of each step code: left, right, up, down
+    return (-1, 1, -grid.stride, grid.stride)
+
+# A keyframe is everything step() reads that the seed doesn't fix: the body
+# stored as its head plus one 2-bit step per segment, length, direction, apple,
+# score, the RNG state (625 words, ~2.5KB) and the order of grid.free, which
+# Apple.move() samples from (2 bytes per free cell on boards up to ~250x250,
+# 4 above that). The free list makes a keyframe about 3KB on the default board
+# but 4MB on 1000x1000, so by default keyframes are spaced out with the board
+# (keyframe_spacing()) to keep them to a few dozen bytes per tick.
+KEYFRAME_CELLS_PER_TICK = 16
+
+def free_typecode(grid):
+    return 'H' if len(grid.occupancy) <= 0x10000 else 'I'
+
+def keyframe_spacing(grid):
+    # 1000 ticks up to 16000 cells (125x128), then one tick more per 16 cells
+    return max(1000, grid.width * grid.height // KEYFRAME_CELLS_PER_TICK)
+
+def free_bytes(grid):
+    # Cell ids are positive, so the 'i' array already has the 'I' layout and can
+    # be written as is; converting it element by element took 45ms at 1000x1000
+    typecode = free_typecode(grid)
+    return grid.free.tobytes() if typecode == 'I' else array(typecode, grid.free).tobytes()
+
+def encode_keyframe(env):
+    snake = env.snake
+    grid = env.grid
+    body = snake.body
+    # Each segment's step from the one before it, as differences of cell ids
+    codes = {delta: code for code, delta in enumerate(step_deltas(grid))}
+    steps = bytes(map(codes.__getitem__, map(sub, body[1:], body)))
+    version, words, gauss_next = env.rng.getstate()
+    head_x, head_y = grid.xy(body[0])
+    apple_x, apple_y = grid.xy(env.apple.cell)
+    return b''.join((
+        KEYFRAME.pack(env.steps, env.score, snake.length, head_x, head_y, apple_x, apple_y,
+                      DIRECTION_CODES[snake.direction], env.hamiltonian_index, len(body)),
+        pack_directions(steps),
+        array('I', words).tobytes(),
+        RNG_TAIL.pack(gauss_next is not None, gauss_next or 0.0),
+        free_bytes(grid),
+    ))
+
+def decode_keyframe(data, env):
+    (steps, score, length, head_x, head_y, apple_x, apple_y, direction, hamiltonian_index,
+     segments) = KEYFRAME.unpack_from(data)
+    offset = KEYFRAME.size
+    packed_size = (segments - 1 + 3) // 4
+    grid = env.grid
+    codes = unpack_directions(data[offset:offset + packed_size], segments - 1)
+    body = array('i', accumulate(map(step_deltas(grid).__getitem__, codes), initial=grid.cell(head_x, head_y)))
+    offset += packed_size
+    words = array('I')
+    words.frombytes(data[offset:offset + 625 * 4])
+    offset += 625 * 4
+    has_gauss, gauss = RNG_TAIL.unpack_from(data, offset)
+    rng_state = (3, tuple(words), gauss if has_gauss else None)
+    free = array(free_typecode(grid))
+    free.frombytes(data[offset + RNG_TAIL.size:])
+    env.restore(body, length, DIRECTIONS[direction], grid.cell(apple_x, apple_y), rng_state,
+                hamiltonian_index, score, steps, free)
+    return env
+
+# Attach to SnakeEnv.recorder: start() is called by reset() and record() at the
+# end of every step, at the cost of one byte append per tick plus a keyframe
+# every keyframe_interval ticks (0 turns them off, None spaces them to suit the
+# board; the spacing used is in `interval`).
+class ReplayRecorder:
+    def __init__(self, keyframe_interval=None):
+        self.keyframe_interval = keyframe_interval
+        self.interval = 0
+        self.seed = None
+        self.width = self.height = 0
+        self.codes = bytearray()
+        self.keyframes = []
+        self.env = None
+
+    def start(self, env):
+        if not 0 <= env.seed < 1 << 64:
+            raise ValueError(f"seed {env.seed!r} does not fit in a replay header")
+        self.env = env
+        self.seed = env.seed
+        self.width, self.height = env.grid.width, env.grid.height
+        self.interval = self.keyframe_interval
+        if self.interval is None:
+            self.interval = keyframe_spacing(env.grid)
+        self.codes = bytearray()
+        self.keyframes = []
+
+    def record(self, direction):
+        self.codes.append(DIRECTION_CODES[direction])
+        interval = self.interval
+        if interval and len(self.codes) % interval == 0 and not self.env.done:
+            self.keyframes.append((len(self.codes), encode_keyframe(self.env)))
+
+    def to_bytes(self):
+        score = self.env.score if self.env is not None else 0
+        header = KEYFRAME_HEADER.pack(KEYFRAME_MAGIC, self.width, self.height, self.seed, len(self.codes), score,
+                                      self.interval, len(self.keyframes))
+        index = []
+        offset = 0
+        for tick, keyframe in self.keyframes:
+            index.append(KEYFRAME_INDEX.pack(tick, offset))
+            offset += len(keyframe)
+        return b''.join([header, pack_directions(self.codes)] + index + [keyframe for _, keyframe in self.keyframes])
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+class Replay:
+    def __init__(self, width, height, seed, ticks, score, packed, keyframe_ticks=(), keyframes=()):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.ticks = ticks
+        self.score = score
+        self.packed = packed
+        self.keyframe_ticks = list(keyframe_ticks)
+        self.keyframes = list(keyframes)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic = data[:4]
+        if magic == REPLAY_MAGIC:
+            _, width, height, seed, ticks, score = REPLAY_HEADER.unpack_from(data)
+            count = 0
+            offset = REPLAY_HEADER.size
+        elif magic == KEYFRAME_MAGIC:
+            _, width, height, seed, ticks, score, _, count = KEYFRAME_HEADER.unpack_from(data)
+            offset = KEYFRAME_HEADER.size
+        else:
+            raise ValueError("not a replay file")
+
+        size = (ticks + 3) // 4
+        packed = data[offset:offset + size]
+        if len(packed) != size:
+            raise ValueError(f"replay is truncated: {ticks} ticks need {size} bytes, got {len(packed)}")
+        offset += size
+
+        index = [KEYFRAME_INDEX.unpack_from(data, offset + i * KEYFRAME_INDEX.size) for i in range(count)]
+        base = offset + count * KEYFRAME_INDEX.size
+        ends = [start for _, start in index[1:]] + [len(data) - base]
+        keyframes = [data[base + start:base + end] for (_, start), end in zip(index, ends)]
+        return cls(width, height, seed, ticks, score, packed, [tick for tick, _ in index], keyframes)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def directions(self, start=0):
+        packed = self.packed
+        for i in range(start, self.ticks):
+            yield DIRECTIONS[(packed[i >> 2] >> ((i & 3) << 1)) & 3]
+
+    def play(self, until=None, env=None):
+        # Steps a headless env from the nearest keyframe at or before `until`
+        # through the recorded moves, no planning involved
+        if env is None:
+            env = SnakeEnv(ai_enabled=False, width=self.width, height=self.height)
+        if (env.grid.width, env.grid.height) != (self.width, self.height):
+            raise ValueError(f"replay is for a {self.width}x{self.height} grid, "
+                             f"not {env.grid.width}x{env.grid.height}")
+        env.reset(self.seed)
+        ticks = self.ticks if until is None else min(until, self.ticks)
+        i = bisect.bisect_right(self.keyframe_ticks, ticks)
+        if i:
+            decode_keyframe(self.keyframes[i - 1], env)
+        for _, direction in zip(range(ticks - env.steps), self.directions(env.steps)):
+            env.step(direction)
+        return env
+
+def record_game(strategy="A*", seed=None, max_steps=20000, keyframe_interval=None, width=GRID_WIDTH,
+                height=GRID_HEIGHT):
+    env = SnakeEnv(search_strategy=strategy, seed=seed, max_steps=max_steps, width=width, height=height)
+    recorder = env.recorder = ReplayRecorder(keyframe_interval)
+    recorder.start(env)
+    while not env.done:
+        env.step()
+    return env, recorder
+
+def describe(env):
+    head = env.grid.xy(env.snake.head_cell)
+    return (f"tick {env.steps}: score {env.score}, length {env.snake.length}, head {head} "
+            f"heading {env.snake.direction}, apple {env.grid.xy(env.apple.cell)}"
+            + (f", dead ({env.death_cause})" if env.done else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="Record an AI game or play a replay back headlessly")
+    parser.add_argument('replay', help="replay file to read, or to write with --record")
+    parser.add_argument('--record', action='store_true', help="play a headless AI game and save its replay")
+    parser.add_argument('--strategy', default="A*", choices=STRATEGIES)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-steps', type=int, default=20000)
+    parser.add_argument('--width', type=int, default=GRID_WIDTH, help="board width when recording")
+    parser.add_argument('--height', type=int, default=GRID_HEIGHT, help="board height when recording")
+    parser.add_argument('--until', type=int, default=None, help="stop the playback at this tick")
+    parser.add_argument('--keyframe-interval', type=int, default=None,
+                        help="ticks between keyframes when recording (0 for none; default: 1000, more on big boards)")
+    args = parser.parse_args()
+    if args.record and grid_size_error(args.width, args.height):
+        parser.error(grid_size_error(args.width, args.height))
+
+    if args.record:
+        env, recorder = record_game(args.strategy, args.seed, args.max_steps, args.keyframe_interval, args.width,
+                                    args.height)
+        recorder.save(args.replay)
+        print(f"recorded seed {env.seed}, {env.steps} ticks and {len(recorder.keyframes)} keyframes "
+              f"in {len(recorder.to_bytes())} bytes")
+        print(describe(env))
+        return
+
+    replay = Replay.load(args.replay)
+    env = replay.play(args.until)
+    print(f"seed {replay.seed}, {replay.ticks} ticks on {replay.width}x{replay.height}")
+    print(describe(env))
+    if args.until is None and env.score != replay.score:
+        raise SystemExit(f"replay diverged: recorded score {replay.score}, replayed {env.score}")
+
+if __name__ == '__main__':
+    main()
@@ -741,202 +741,245 @@ if __name__ == '__main__':
     game.run()
 '''
 # toggle between manual mode and AI mode
+import argparse
+import os
+import time
+from collections import OrderedDict
+
 import pygame
 from pygame.locals import *
-import random
-from collections import deque
-import heapq
+from engine import SIZE, GRID_WIDTH, GRID_HEIGHT, MAX_GRID_SIZE, SnakeEnv, grid_size_error
+from arena import Arena
+from planner import AsyncPlanner
+from profiling import NULL_PROFILER, Profiler
+from telemetry import TelemetrySink
+from replay import ReplayRecorder
+from stats import StatsStore
+import engine
 
 # Constants
-SIZE = 40
-GRID_WIDTH = 25
-GRID_HEIGHT = 12
-SCREEN_WIDTH = GRID_WIDTH * SIZE
-SCREEN_HEIGHT = GRID_HEIGHT * SIZE + 60  # Extra UI panel height
-
-# Pathfinding functions
-
-def manhattan(p1, p2):
-    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
-
-def astar(start, goal, grid_size, snake_body):
-    directions = [(-SIZE, 0), (SIZE, 0), (0, -SIZE), (0, SIZE)]
-    open_set = []
-    heapq.heappush(open_set, (0 + manhattan(start, goal), 0, start))
-    came_from = {}
-    g_score = {start: 0}
-    visited = set()
-
-    while open_set:
-        _, cost, current = heapq.heappop(open_set)
-        if current == goal:
-            path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
-            path.reverse()
-            return path
-
-        if current in visited:
-            continue
-        visited.add(current)
-
-        for dx, dy in directions:
-            neighbor = (current[0] + dx, current[1] + dy)
-            if 0 <= neighbor[0] < grid_size[0] and 0 <= neighbor[1] < grid_size[1] and neighbor not in snake_body:
-                tentative_g = g_score[current] + 1
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g
-                    f_score = tentative_g + manhattan(neighbor, goal)
-                    heapq.heappush(open_set, (f_score, tentative_g, neighbor))
-    return []
-
-def bfs(start, goal, grid_size, snake_body):
-    directions = [(-SIZE, 0), (SIZE, 0), (0, -SIZE), (0, SIZE)]
-    queue = deque([start])
-    visited = set([start])
-    parent = {}
-    snake_body_except_tail = set(list(snake_body)[:-1])
-
-    while queue:
-        current = queue.popleft()
-        if current == goal:
-            path = []
-            while current != start:
-                path.append(current)
-                current = parent[current]
-            path.reverse()
-            return path
-
-        for dx, dy in directions:
-            neighbor = (current[0] + dx, current[1] + dy)
-            if 0 <= neighbor[0] < grid_size[0] and 0 <= neighbor[1] < grid_size[1]:
-                if neighbor not in snake_body_except_tail and neighbor not in visited:
-                    visited.add(neighbor)
-                    parent[neighbor] = current
-                    queue.append(neighbor)
-    return []
-
-def generate_hamiltonian_cycle():
-    path = []
-    for y in range(GRID_HEIGHT):
-        row = list(range(GRID_WIDTH))
-        if y % 2 == 1:
-            row.reverse()
-        for x in row:
-            path.append((x * SIZE, y * SIZE))
-    return path
+PANEL_HEIGHT = 60  # UI panel under the board
+MIN_SCREEN_WIDTH = 1000  # room for the panel text
+MAX_BOARD_WIDTH = 1600
+MAX_BOARD_HEIGHT = 1000
+MIN_SPRITE_CELL = 8  # smaller cells are drawn as plain coloured squares
+LARGE_BOARD_CELLS = 100 * 100  # past this the AI starts on the bounded Anytime search
+MAX_CATCH_UP_TICKS = 5  # ticks run back to back after a stall before the backlog is dropped
+MAX_DIRTY_CELLS = 200  # past this a full redraw is cheaper than cell by cell
+
+# The head-to-tail gradient, quantized so every shade can be pre-rendered
+GRADIENT_COLORS = [(50 + 205 * i // 32, 180, 30) for i in range(32)]
+
+# Dirty-rect rendering can't use the length-based gradient (every segment would
+# change colour every tick), so each segment keeps the colour of the tick it was
+# laid down on instead.
+STRIPE_COLORS = [(50 + 25 * i, 180, 30) for i in range(8)] + [(225 - 25 * i, 180, 30) for i in range(6)]
+
+# Boards too big for sprites are drawn one colour per cell: background, body,
+# head and apple. The full frame is the occupancy grid translated byte for byte
+# into palette indices, then scaled up to the board.
+BACKGROUND_COLOR = (30, 40, 30)
+CELL_COLORS = [BACKGROUND_COLOR, (110, 180, 30), (20, 100, 0), (220, 20, 60)]
+BODY_PIXEL, HEAD_PIXEL, APPLE_PIXEL = 1, 2, 3
+OCCUPANCY_PIXELS = bytes([0] + [BODY_PIXEL] * 254 + [0])
+
+def cell_pixels(width, height):
+    # Largest square cell, up to SIZE, that fits the board in the window; at
+    # least one pixel, so a 1000x1000 board is drawn one pixel per cell
+    return max(1, min(SIZE, MAX_BOARD_WIDTH // width, MAX_BOARD_HEIGHT // height))
+
+def screen_pos(grid, cell, cell_px):
+    y, x = divmod(cell, grid.stride)
+    return ((x - 1) * cell_px, (y - 1) * cell_px)
+
+# Every tile the board needs, drawn once: one body segment per palette colour,
+# the eyes for each head direction and the apple
+class SpriteAtlas:
+    def __init__(self, size, palette):
+        self.segments = [self.segment_tile(size, color) for color in palette]
+        self.eyes = {direction: self.eye_overlay(size, direction) for direction in ('left', 'right', 'up', 'down')}
+        self.apple = self.apple_sprite(size)
+
+    @staticmethod
+    def segment_tile(size, color):
+        tile = pygame.Surface((size, size)).convert()
+        tile.fill(color)
+        pygame.draw.rect(tile, (20, 100, 0), tile.get_rect(), 2)
+        return tile
+
+    @staticmethod
+    def eye_overlay(size, direction):
+        eye_radius = size // 8
+        eye_offset = size // 4
+        far = size - eye_offset
+        if direction == 'left':
+            eyes = [(eye_offset, eye_offset), (eye_offset, far)]
+        elif direction == 'right':
+            eyes = [(far, eye_offset), (far, far)]
+        elif direction == 'up':
+            eyes = [(eye_offset, eye_offset), (far, eye_offset)]
+        else:
+            eyes = [(eye_offset, far), (far, far)]
 
-class Apple:
-    def __init__(self, parent_screen):
+        overlay = pygame.Surface((size, size), pygame.SRCALPHA).convert_alpha()
+        overlay.fill((0, 0, 0, 0))
+        for eye_pos in eyes:
+            pygame.draw.circle(overlay, (0, 0, 0), eye_pos, eye_radius)
+        return overlay
+
+    @staticmethod
+    def apple_sprite(size):
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA).convert_alpha()
+        sprite.fill((0, 0, 0, 0))
+        center = (size // 2, size // 2)
+        highlight = size * 3 // 20
+        pygame.draw.circle(sprite, (220, 20, 60), center, size//2 - size//8)
+        pygame.draw.circle(sprite, (255, 100, 100), (center[0] - highlight, center[1] - highlight), size//4)
+        return sprite
+
+# Rendered text surfaces keyed on (font, text, color), least recently used
+# evicted first. Labels that don't change are rendered once; score labels only
+# when the number does.
+class TextCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+_atlases = {}
+
+def sprite_atlas(size, palette):
+    key = (size, tuple(palette))
+    if key not in _atlases:
+        _atlases[key] = SpriteAtlas(size, palette)
+    return _atlases[key]
+
+class Apple(engine.Apple):
+    __slots__ = ('parent_screen', 'cell_px', 'sprites')
+
+    def __init__(self, parent_screen, rng, grid, cell_px=SIZE):
         self.parent_screen = parent_screen
-        self.move()
+        self.cell_px = cell_px
+        self.sprites = sprite_atlas(cell_px, GRADIENT_COLORS)
+        super().__init__(rng, grid)
 
     def draw(self):
-        center = (self.x + SIZE // 2, self.y + SIZE // 2)
-        pygame.draw.circle(self.parent_screen, (220, 20, 60), center, SIZE//2 - 5)
-        pygame.draw.circle(self.parent_screen, (255, 100, 100), (center[0]-6, center[1]-6), SIZE//4)
+        return self.parent_screen.blit(self.sprites.apple, screen_pos(self.grid, self.cell, self.cell_px))
 
-    def move(self):
-        self.x = SIZE * random.randint(0, GRID_WIDTH - 1)
-        self.y = SIZE * random.randint(0, GRID_HEIGHT - 1)
+class Snake(engine.Snake):
+    __slots__ = ('parent_screen', 'cell_px', 'sprites', 'stripes')
 
-class Snake:
-    def __init__(self, parent_screen):
+    def __init__(self, parent_screen, grid, cell_px=SIZE):
         self.parent_screen = parent_screen
-        self.direction = 'down'
-        self.length = 1
-        self.body = deque([(SIZE * 2, SIZE * 2)])
+        self.cell_px = cell_px
+        self.sprites = sprite_atlas(cell_px, GRADIENT_COLORS)
+        self.stripes = sprite_atlas(cell_px, STRIPE_COLORS)
+        super().__init__(grid)
 
     def draw(self):
-        for i, segment in enumerate(self.body):
-            shade = 50 + int((205 / self.length) * i)
-            color = (shade, 180, 30)
-            rect = pygame.Rect(segment[0], segment[1], SIZE, SIZE)
-            pygame.draw.rect(self.parent_screen, color, rect)
-            pygame.draw.rect(self.parent_screen, (20, 100, 0), rect, 2)
-
-        head_x, head_y = self.body[0]
-        eye_radius = 5
-        eye_offset = 10
-        eye_color = (0, 0, 0)
-
-        if self.direction == 'left':
-            eyes = [(head_x + eye_offset, head_y + eye_offset), (head_x + eye_offset, head_y + SIZE - eye_offset)]
-        elif self.direction == 'right':
-            eyes = [(head_x + SIZE - eye_offset, head_y + eye_offset), (head_x + SIZE - eye_offset, head_y + SIZE - eye_offset)]
-        elif self.direction == 'up':
-            eyes = [(head_x + eye_offset, head_y + eye_offset), (head_x + SIZE - eye_offset, head_y + eye_offset)]
-        else:
-            eyes = [(head_x + eye_offset, head_y + SIZE - eye_offset), (head_x + SIZE - eye_offset, head_y + SIZE - eye_offset)]
-
-        for eye_pos in eyes:
-            pygame.draw.circle(self.parent_screen, eye_color, eye_pos, eye_radius)
-
-    def move_left(self):
-        if self.direction != 'right':
-            self.direction = 'left'
-
-    def move_right(self):
-        if self.direction != 'left':
-            self.direction = 'right'
-
-    def move_up(self):
-        if self.direction != 'down':
-            self.direction = 'up'
-
-    def move_down(self):
-        if self.direction != 'up':
-            self.direction = 'down'
-
-    def walk(self):
-        head_x, head_y = self.body[0]
-        if self.direction == 'left':
-            head_x -= SIZE
-        elif self.direction == 'right':
-            head_x += SIZE
-        elif self.direction == 'up':
-            head_y -= SIZE
-        elif self.direction == 'down':
-            head_y += SIZE
-
-        self.body.appendleft((head_x, head_y))
-        if len(self.body) > self.length:
-            self.body.pop()
-
-    def grow(self):
-        self.length += 1
-
-    def check_collision_with_self(self):
-        head = self.body[0]
-        return head in list(self.body)[1:]
-
-class Game:
-    def __init__(self):
+        tiles = self.sprites.segments
+        blit = self.parent_screen.blit
+        grid, cell_px = self.grid, self.cell_px
+        for i, cell in enumerate(self.segments()):
+            blit(tiles[i * len(tiles) // self.length], screen_pos(grid, cell, cell_px))
+        self.draw_eyes()
+
+    def draw_striped(self, steps):
+        tiles = self.stripes.segments
+        blit = self.parent_screen.blit
+        grid, cell_px = self.grid, self.cell_px
+        for i, cell in enumerate(self.segments()):
+            blit(tiles[(steps - i) % len(tiles)], screen_pos(grid, cell, cell_px))
+        self.draw_eyes()
+
+    def draw_eyes(self):
+        self.parent_screen.blit(self.sprites.eyes[self.direction], screen_pos(self.grid, self.head_cell, self.cell_px))
+
+class Game(SnakeEnv):
+    def __init__(self, dirty_rendering=False, tick_rate=8, frame_rate=30, input_rate=60,
+                 turbo=False, turbo_render_every=100, async_planning=True, plan_deadline=None, plan_budget=2000,
+                 stats_path="stats.db", replay_path="last_game.rpl", profile=False, telemetry=None,
+                 width=GRID_WIDTH, height=GRID_HEIGHT, plan_time_budget=None):
         pygame.init()
         pygame.mixer.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        # The board is scaled to fit the window: sprites down to MIN_SPRITE_CELL
+        # pixels a cell, one colour per cell below that
+        self.cell_px = cell_pixels(width, height)
+        self.pixel_mode = self.cell_px < MIN_SPRITE_CELL
+        self.board_rect = pygame.Rect(0, 0, width * self.cell_px, height * self.cell_px)
+        screen_width = max(self.board_rect.width, MIN_SCREEN_WIDTH)
+        self.panel_rect = pygame.Rect(0, self.board_rect.height, screen_width, PANEL_HEIGHT)
+        self.screen = pygame.display.set_mode((screen_width, self.board_rect.height + PANEL_HEIGHT))
         pygame.display.set_caption("Crawling Cobras")
 
-        self.snake = Snake(self.screen)
-        self.apple = Apple(self.screen)
+        # Simulation ticks, rendered frames and event polls each run on their own
+        # clock. Turbo steps as fast as possible and renders every Nth tick.
+        self.tick_rate = tick_rate
+        self.frame_rate = frame_rate
+        self.input_rate = input_rate
+        self.turbo = turbo
+        self.turbo_render_every = turbo_render_every
+
+        # Per-phase timings, printed with P and on exit; a no-op unless asked for
+        self.profiler = Profiler() if profile else NULL_PROFILER
+
+        self.dirty_rendering = dirty_rendering
+        self.dirty_cells = set()
+        self.laid_at = {}
+        self.background = pygame.Surface((screen_width, self.board_rect.height))
+        self.background.fill(BACKGROUND_COLOR)
+        if not self.pixel_mode:
+            self.draw_grid(self.background)
+        self.panel_state = None
+
+        # A search may use at most half a tick or a frame, whichever is shorter.
+        # Unbounded A* on a big board can take seconds, so there the AI starts
+        # on the Anytime search, which keeps to that budget.
+        if plan_time_budget is None:
+            plan_time_budget = 0.5 * min(1 / tick_rate, 1 / frame_rate)
+        strategy = "Anytime" if width * height > LARGE_BOARD_CELLS else "A*"
+        super().__init__(search_strategy=strategy, ai_enabled=True, plan_budget=plan_budget,
+                         plan_time_budget=plan_time_budget, width=width, height=height)
+
+        # The AI plans tick t+1 on a worker thread while tick t is drawn. By default
+        # a plan may take up to one tick interval before the fallback move is used.
+        # Every game is recorded; the last one is saved when it ends
+        self.replay_path = replay_path
+        self.recorder = ReplayRecorder()
+        self.recorder.start(self)
+        self.telemetry = telemetry
+
+        self.planner = None
+        if async_planning:
+            self.planner = AsyncPlanner(self, plan_deadline if plan_deadline is not None else 1 / tick_rate)
 
-        self.score = 0
         self.font = pygame.font.SysFont('arial', 24)
         self.game_over_font = pygame.font.SysFont('arial', 60, bold=True)
         self.info_font = pygame.font.SysFont('arial', 18)
+        self.text_cache = TextCache()
+        self.game_over_overlay = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
+        self.game_over_overlay.fill((0, 0, 0, 180))
 
-        try:
-            with open("highscore.txt", "r") as f:
-                self.high_score = int(f.read())
-        except:
-            self.high_score = 0
-
-        self.ai_enabled = True
-        self.hamiltonian_path = generate_hamiltonian_cycle()
-        self.hamiltonian_index = 0
-        self.search_strategy = "A*"
+        # Finished runs and the high score are written by the store's own thread;
+        # highscore.txt is kept as a mirror for older versions of the game
+        self.stats = StatsStore(stats_path, high_score_path="highscore.txt")
+        self.high_score = self.stats.high_score()
 
         self.game_over_sound = None
         try:
@@ -944,39 +987,159 @@ class Game:
         except:
             pass  # no sound file, ignore
 
-    def draw_grid(self):
-        for x in range(0, SCREEN_WIDTH, SIZE):
-            pygame.draw.line(self.screen, (180, 180, 180), (x, 0), (x, GRID_HEIGHT * SIZE))
-        for y in range(0, GRID_HEIGHT * SIZE, SIZE):
-            pygame.draw.line(self.screen, (180, 180, 180), (0, y), (SCREEN_WIDTH, y))
+    def new_snake(self):
+        return Snake(self.screen, self.grid, self.cell_px)
+
+    def new_apple(self):
+        return Apple(self.screen, self.rng, self.grid, self.cell_px)
+
+    def reset(self, seed=None):
+        self.needs_full_redraw = True
+        self.game_over_shown = False
+        observation = super().reset(seed)
+        self.rendered_steps = -1
+        self.dirty_cells.clear()
+        self.laid_at = {self.snake.head_cell: 0}
+        return observation
+
+    def draw_grid(self, surface):
+        board = self.board_rect
+        for x in range(0, board.width, self.cell_px):
+            pygame.draw.line(surface, (180, 180, 180), (x, 0), (x, board.height))
+        for y in range(0, board.height, self.cell_px):
+            pygame.draw.line(surface, (180, 180, 180), (0, y), (board.width, y))
+
+    def draw_cells(self):
+        # The whole board in three C-level passes: slice the rows out of the padded
+        # occupancy grid, map counts to palette indices, scale to the board
+        grid = self.grid
+        occupancy, stride, width = grid.occupancy, grid.stride, grid.width
+        rows = b''.join([occupancy[row * stride + 1:row * stride + 1 + width] for row in range(1, grid.height + 1)])
+        image = pygame.image.frombuffer(rows.translate(OCCUPANCY_PIXELS), (width, grid.height), 'P')
+        image.set_palette(CELL_COLORS)
+        self.screen.blit(pygame.transform.scale(image, self.board_rect.size), self.board_rect)
+        self.fill_cell(self.snake.head_cell, CELL_COLORS[HEAD_PIXEL])
+        self.fill_cell(self.apple.cell, CELL_COLORS[APPLE_PIXEL])
+
+    def fill_cell(self, cell, color):
+        x, y = screen_pos(self.grid, cell, self.cell_px)
+        return self.screen.fill(color, (x, y, self.cell_px, self.cell_px))
 
     def draw_ui_panel(self):
-        panel_rect = pygame.Rect(0, GRID_HEIGHT * SIZE, SCREEN_WIDTH, 60)
-        pygame.draw.rect(self.screen, (40, 40, 40), panel_rect)
-
-        score_text = self.font.render(f"Score: {self.score}", True, (255, 255, 255))
-        high_score_text = self.font.render(f"High Score: {self.high_score}", True, (255, 255, 255))
-        strategy_text = self.font.render(f"Strategy: {self.search_strategy}", True, (255, 255, 255))
-        mode_text = self.font.render(f"Mode: {'AI' if self.ai_enabled else 'Manual'}", True, (255, 255, 255))
-        control_text = self.info_font.render("Press A for A*, B for BFS, M to Toggle Mode | ESC to Quit", True, (200, 200, 200))
+        panel = self.panel_rect
+        pygame.draw.rect(self.screen, (40, 40, 40), panel)
+
+        render = self.text_cache.render
+        score_text = render(self.font, f"Score: {self.score}", (255, 255, 255))
+        high_score_text = render(self.font, f"High Score: {self.high_score}", (255, 255, 255))
+        strategy_text = render(self.font, f"Strategy: {self.search_strategy}", (255, 255, 255))
+        mode_text = render(self.font, f"Mode: {'AI' if self.ai_enabled else 'Manual'}", (255, 255, 255))
+        control_text = render(self.info_font, "Press A for A*, B for BFS, N for Anytime, S for Safe, M to Toggle Mode, R for Dirty Rects, T for Turbo | ESC to Quit", (200, 200, 200))
+
+        self.screen.blit(score_text, (10, panel.top + 5))
+        self.screen.blit(high_score_text, (180, panel.top + 5))
+        self.screen.blit(strategy_text, (410, panel.top + 5))
+        self.screen.blit(mode_text, (600, panel.top + 5))
+        self.screen.blit(control_text, (10, panel.top + 32))
+        return panel
+
+    def render_full(self):
+        profiler = self.profiler
+        started = profiler.start()
+        self.screen.blit(self.background, (0, 0))
+        profiler.stop('draw_board', started)
+
+        started = profiler.start()
+        self.draw_ui_panel()
+        profiler.stop('draw_panel', started)
+
+        started = profiler.start()
+        if self.pixel_mode:
+            self.draw_cells()
+        elif self.dirty_rendering:
+            self.snake.draw_striped(self.steps)
+        else:
+            self.snake.draw()
+        if not self.pixel_mode:
+            self.apple.draw()
+        profiler.stop('draw_snake', started)
 
-        self.screen.blit(score_text, (10, GRID_HEIGHT * SIZE + 5))
-        self.screen.blit(high_score_text, (180, GRID_HEIGHT * SIZE + 5))
-        self.screen.blit(strategy_text, (410, GRID_HEIGHT * SIZE + 5))
-        self.screen.blit(mode_text, (600, GRID_HEIGHT * SIZE + 5))
-        self.screen.blit(control_text, (10, GRID_HEIGHT * SIZE + 32))
+        started = profiler.start()
+        pygame.display.flip()
+        profiler.stop('flip', started)
+        self.needs_full_redraw = False
+        self.dirty_cells.clear()
+
+    def render_dirty(self):
+        # Only the cells tick() touched since the last frame are redrawn, however
+        # many ticks that was. Each snake cell keeps the stripe of the tick it was
+        # laid down on, so the result matches draw_striped()
+        if len(self.dirty_cells) > MAX_DIRTY_CELLS:
+            self.render_full()
+            return
+
+        profiler = self.profiler
+        started = profiler.start()
+        tiles = self.snake.stripes.segments
+        apple = self.apple.cell
+        grid, cell_px = self.grid, self.cell_px
+        rects = []
+        for cell in self.dirty_cells:
+            rect = pygame.Rect(screen_pos(grid, cell, cell_px), (cell_px, cell_px))
+            if self.pixel_mode:
+                pixel = BODY_PIXEL if self.snake.occupies(cell) else APPLE_PIXEL if cell == apple else 0
+                self.screen.fill(CELL_COLORS[pixel], rect)
+            elif self.snake.occupies(cell):
+                self.screen.blit(tiles[self.laid_at[cell] % len(tiles)], rect)
+            else:
+                self.screen.blit(self.background, rect, rect)
+                if cell == apple:
+                    self.apple.draw()
+            rects.append(rect)
+        self.dirty_cells.clear()
+        if self.pixel_mode:
+            self.fill_cell(self.snake.head_cell, CELL_COLORS[HEAD_PIXEL])
+        else:
+            self.snake.draw_eyes()
+        profiler.stop('draw_snake', started)
+
+        panel_state = (self.score, self.high_score, self.search_strategy, self.ai_enabled)
+        if panel_state != self.panel_state:
+            self.panel_state = panel_state
+            started = profiler.start()
+            rects.append(self.draw_ui_panel())
+            profiler.stop('draw_panel', started)
+
+        started = profiler.start()
+        pygame.display.update(rects)
+        profiler.stop('flip', started)
+
+    def render(self):
+        started = time.perf_counter_ns()
+        if self.dirty_rendering and not self.needs_full_redraw:
+            self.render_dirty()
+        else:
+            self.render_full()
+        self.rendered_steps = self.steps
+        elapsed = time.perf_counter_ns() - started
+        self.profiler.record('render', elapsed)
+        if self.telemetry is not None:
+            self.telemetry.frame(elapsed)
 
     def show_game_over(self):
-        overlay = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        self.screen.blit(overlay, (0, 0))
+        # Nothing on the game over screen changes until the next reset, so it is
+        # composed and flipped once rather than every frame
+        if self.game_over_shown:
+            return
+        self.game_over_shown = True
+        self.screen.blit(self.game_over_overlay, (0, 0))
 
         def draw_text_with_shadow(text, font, color, x, y):
             shadow_color = (0, 0, 0)
             shadow_offset = 3
-            shadow = font.render(text, True, shadow_color)
+            shadow = self.text_cache.render(font, text, shadow_color)
             self.screen.blit(shadow, (x + shadow_offset, y + shadow_offset))
-            text_surface = font.render(text, True, color)
+            text_surface = self.text_cache.render(font, text, color)
             self.screen.blit(text_surface, (x, y))
 
         center_x = self.screen.get_width() // 2
@@ -985,127 +1148,319 @@ class Game:
         draw_text_with_shadow(f"Your Score: {self.score}  High Score: {self.high_score}", self.font, (255, 255, 255), center_x - 180, 290)
         pygame.display.flip()
 
-    def reset(self):
-        self.snake = Snake(self.screen)
-        self.apple = Apple(self.screen)
-        self.score = 0
-        self.hamiltonian_path = generate_hamiltonian_cycle()
-        self.hamiltonian_index = 0
-
-    def is_collision(self, x1, y1, x2, y2):
-        r1 = pygame.Rect(x1, y1, SIZE, SIZE)
-        r2 = pygame.Rect(x2, y2, SIZE, SIZE)
-        return r1.colliderect(r2)
+    def tick(self):
+        old_head, old_tail = self.snake.head_cell, self.snake.tail_cell
+        old_apple = self.apple.cell
+
+        profiler = self.profiler
+        tick_started = profiler.start()
+        started = time.perf_counter_ns()
+        direction = None
+        if self.ai_enabled:
+            if self.planner is not None:
+                direction = self.planner.next_direction()
+            else:
+                direction = self.plan() or self.snake.direction
+        self.plan_ns = time.perf_counter_ns() - started
+        profiler.record('plan', self.plan_ns)
+
+        started = profiler.start()
+        _, ate, done, _ = self.step(direction)
+        profiler.stop('simulate', started)
+
+        if self.planner is not None and self.ai_enabled and not done:
+            started = profiler.start()
+            self.planner.submit()
+            profiler.stop('plan_submit', started)
+
+        started = profiler.start()
+        if done:
+            if self.game_over_sound:
+                self.game_over_sound.play()
+            self.stats.record_run(self.score, self.snake.length, self.steps,
+                                  self.search_strategy if self.ai_enabled else "Manual", self.death_cause, self.seed)
+            if self.replay_path:
+                self.recorder.save(self.replay_path)
+
+        if ate and self.score > self.high_score:
+            self.high_score = self.score
+            self.stats.update_high_score(self.score)
+        profiler.stop('stats', started)
+
+        # Remember which cells changed so the next frame only redraws those
+        new_head = self.snake.head_cell
+        self.laid_at[new_head] = self.steps
+        self.dirty_cells.add(old_head)
+        self.dirty_cells.add(new_head)
+        if self.snake.tail_cell != old_tail:
+            self.dirty_cells.add(old_tail)
+        if self.apple.cell != old_apple:
+            self.dirty_cells.add(self.apple.cell)
+        profiler.stop('tick', tick_started)
+
+    def profile_summary(self):
+        profiler = self.profiler
+        planner = self.planner
+        profiler.set('nodes_expanded', self.nodes_expanded() + (planner.nodes_expanded() if planner else 0))
+        profiler.set('cache_hits', self.path_cache.hits + (planner.path_cache.hits if planner else 0))
+        profiler.set('cache_misses', self.path_cache.misses + (planner.path_cache.misses if planner else 0))
+        profiler.set('fallbacks', planner.fallbacks if planner else self.fallbacks)
+        if planner is not None:
+            profiler.set('deadline_miss', planner.misses)
+        profiler.set('text_renders', self.text_cache.misses)
+        return profiler.summary()
+
+    def handle_event(self, event):
+        if event.type == QUIT:
+            return False
+        if event.type != KEYDOWN:
+            return True
+
+        if event.key == K_ESCAPE:
+            return False
+        if event.key == K_m:
+            self.ai_enabled = not self.ai_enabled  # Toggle AI/manual mode
+
+        if not self.done and not self.ai_enabled:
+            if event.key == K_UP:
+                self.snake.move_up()
+            elif event.key == K_DOWN:
+                self.snake.move_down()
+            elif event.key == K_LEFT:
+                self.snake.move_left()
+            elif event.key == K_RIGHT:
+                self.snake.move_right()
+        elif self.done:
+            if event.key == K_RETURN:
+                self.reset()
+
+        if event.key == K_b:
+            self.search_strategy = "BFS"
+        elif event.key == K_a:
+            self.search_strategy = "A*"
+        elif event.key == K_n:
+            self.search_strategy = "Anytime"
+        elif event.key == K_s:
+            self.search_strategy = "Safe"
+        elif event.key == K_r:
+            self.dirty_rendering = not self.dirty_rendering
+            self.needs_full_redraw = True
+        elif event.key == K_t:
+            self.turbo = not self.turbo
+        elif event.key == K_p and self.profiler is not NULL_PROFILER:
+            print(self.profile_summary())
+        return True
 
     def run(self):
+        # Fixed timestep: the simulation advances at tick_rate no matter how long
+        # frames take, frames are drawn at most frame_rate times a second and
+        # input is polled at input_rate, so a slow render never slows the snake
         running = True
-        game_over = False
-        clock = pygame.time.Clock()
+        now = time.perf_counter()
+        next_tick = next_frame = next_input = now
 
         while running:
-            for event in pygame.event.get():
-                if event.type == KEYDOWN:
-                    if event.key == K_ESCAPE:
+            now = time.perf_counter()
+            if now >= next_input:
+                started = self.profiler.start()
+                for event in pygame.event.get():
+                    if not self.handle_event(event):
                         running = False
-                    if event.key == K_m:
-                        self.ai_enabled = not self.ai_enabled  # Toggle AI/manual mode
-
-                    if not game_over and not self.ai_enabled:
-                        if event.key == K_UP:
-                            self.snake.move_up()
-                        elif event.key == K_DOWN:
-                            self.snake.move_down()
-                        elif event.key == K_LEFT:
-                            self.snake.move_left()
-                        elif event.key == K_RIGHT:
-                            self.snake.move_right()
-                    elif game_over:
-                        if event.key == K_RETURN:
-                            self.reset()
-                            game_over = False
-
-                    if event.key == K_b:
-                        self.search_strategy = "BFS"
-                    elif event.key == K_a:
-                        self.search_strategy = "A*"
-
-                elif event.type == QUIT:
-                    running = False
-
-            if not game_over:
-                self.screen.fill((30, 40, 30))
-                self.draw_grid()
-                self.draw_ui_panel()
-
-                if self.ai_enabled:
-                    snake_head = self.snake.body[0]
-                    apple_pos = (self.apple.x, self.apple.y)
-                    snake_body_set = set(self.snake.body)
-                    grid_bounds = (SCREEN_WIDTH, GRID_HEIGHT * SIZE)
-
-                    if self.search_strategy == "A*":
-                        path = astar(snake_head, apple_pos, grid_bounds, snake_body_set)
-                    elif self.search_strategy == "BFS":
-                        path = bfs(snake_head, apple_pos, grid_bounds, snake_body_set)
-                    else:
-                        path = []
-
-                    if path:
-                        next_move = path[0]
-                    else:
-                        while self.hamiltonian_index < len(self.hamiltonian_path) and self.hamiltonian_path[self.hamiltonian_index] in self.snake.body:
-                            self.hamiltonian_index = (self.hamiltonian_index + 1) % len(self.hamiltonian_path)
-                        next_move = self.hamiltonian_path[self.hamiltonian_index]
-                        self.hamiltonian_index = (self.hamiltonian_index + 1) % len(self.hamiltonian_path)
-
-                    head_x, head_y = self.snake.body[0]
-                    if next_move[0] < head_x:
-                        self.snake.move_left()
-                    elif next_move[0] > head_x:
-                        self.snake.move_right()
-                    elif next_move[1] < head_y:
-                        self.snake.move_up()
-                    elif next_move[1] > head_y:
-                        self.snake.move_down()
-
-                self.snake.walk()
-
-                # Check collision with walls
-                head_x, head_y = self.snake.body[0]
-                if not (0 <= head_x < SCREEN_WIDTH and 0 <= head_y < GRID_HEIGHT * SIZE):
-                    game_over = True
-                    if self.game_over_sound:
-                        self.game_over_sound.play()
+                self.profiler.stop('input', started)
+                next_input = max(next_input + 1 / self.input_rate, now)
 
-                # Check collision with self
-                if self.snake.check_collision_with_self():
-                    game_over = True
-                    if self.game_over_sound:
-                        self.game_over_sound.play()
+            if self.done:
+                if self.rendered_steps != self.steps:
+                    self.render()
+                self.show_game_over()
+                next_tick = next_frame = now
 
-                # Check apple collision
-                if self.is_collision(head_x, head_y, self.apple.x, self.apple.y):
-                    self.score += 1
-                    if self.score > self.high_score:
-                        self.high_score = self.score
-                        with open("highscore.txt", "w") as f:
-                            f.write(str(self.high_score))
-                    self.snake.grow()
-                    self.apple.move()
+            elif self.turbo:
+                self.tick()
+                if self.done or self.steps - self.rendered_steps >= self.turbo_render_every:
+                    self.render()
+                next_tick = next_frame = time.perf_counter()
+                continue
 
-                self.snake.draw()
-                self.apple.draw()
+            else:
+                ticks = 0
+                while now >= next_tick and not self.done and ticks < MAX_CATCH_UP_TICKS:
+                    self.tick()
+                    next_tick += 1 / self.tick_rate
+                    ticks += 1
+                if now >= next_tick:
+                    # Too far behind to catch up, drop the backlog instead of spiralling
+                    next_tick = now + 1 / self.tick_rate
+
+                if now >= next_frame:
+                    if self.rendered_steps != self.steps or self.needs_full_redraw:
+                        self.render()
+                    next_frame = max(next_frame + 1 / self.frame_rate, now)
+
+            wake = next_input if self.done else min(next_tick, next_frame, next_input)
+            delay = wake - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        self.stats.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.profiler is not NULL_PROFILER:
+            print(self.profile_summary())
+        if self.planner is not None:
+            self.planner.close()
+            print(f"planner: {self.planner.plans} plans, {self.planner.misses} missed the deadline "
+                  f"({100 * self.planner.miss_rate():.1f}%), {self.planner.fallbacks} fallback moves")
+        pygame.quit()
 
-                pygame.display.flip()
-                clock.tick(8)
+# Pygame view of an arena.Arena: every snake in its own colour, one flat colour
+# per cell like Game on large boards, on the same fixed-timestep loop without
+# turbo or dirty rects. Dead snakes respawn; RETURN starts a new arena.
+class ArenaView:
+    def __init__(self, arena, tick_rate=8, frame_rate=30):
+        pygame.init()
+        self.arena = arena
+        grid = arena.grid
+        self.tick_rate = tick_rate
+        self.frame_rate = frame_rate
+        self.cell_px = cell_pixels(grid.width, grid.height)
+        self.board_rect = pygame.Rect(0, 0, grid.width * self.cell_px, grid.height * self.cell_px)
+        screen_width = max(self.board_rect.width, MIN_SCREEN_WIDTH)
+        self.panel_rect = pygame.Rect(0, self.board_rect.height, screen_width, PANEL_HEIGHT)
+        self.screen = pygame.display.set_mode((screen_width, self.board_rect.height + PANEL_HEIGHT))
+        pygame.display.set_caption("Crawling Cobras Arena")
+        self.screen.fill(BACKGROUND_COLOR)
+
+        # Palette index 0 is the background, 1..n the snakes, the last the apples
+        colors = []
+        for i in range(min(arena.num_snakes, 254)):
+            color = pygame.Color(0)
+            color.hsva = (360 * i / min(arena.num_snakes, 254), 70, 95, 100)
+            colors.append(tuple(color)[:3])
+        self.palette = [BACKGROUND_COLOR] + colors + [CELL_COLORS[APPLE_PIXEL]]
+        self.font = pygame.font.SysFont('arial', 24)
+        self.info_font = pygame.font.SysFont('arial', 18)
+        self.text_cache = TextCache()
+
+    def draw_board(self):
+        arena = self.arena
+        grid = arena.grid
+        width, stride = grid.width, grid.stride
+        snake_colors = len(self.palette) - 2
+        pixels = bytearray(width * grid.height)
+        for i, snake in enumerate(arena.snakes):
+            if arena.alive[i]:
+                color = i % snake_colors + 1
+                for cell in snake.segments():
+                    y, x = divmod(cell, stride)
+                    pixels[(y - 1) * width + x - 1] = color
+        for apple in arena.apples:
+            y, x = divmod(apple.cell, stride)
+            pixels[(y - 1) * width + x - 1] = len(self.palette) - 1
+        image = pygame.image.frombuffer(pixels, (width, grid.height), 'P')
+        image.set_palette(self.palette)
+        self.screen.blit(pygame.transform.scale(image, self.board_rect.size), self.board_rect)
 
-            else:
-                self.show_game_over()
-                clock.tick(15)
+    def draw_ui_panel(self):
+        arena = self.arena
+        panel = self.panel_rect
+        pygame.draw.rect(self.screen, (40, 40, 40), panel)
+        render = self.text_cache.render
+        status = (f"Tick: {arena.steps}   Alive: {sum(arena.alive)}/{arena.num_snakes}   "
+                  f"Eaten: {sum(arena.scores)}   Best: {max(arena.scores)}   Late plans: {arena.misses}")
+        self.screen.blit(render(self.font, status, (255, 255, 255)), (10, panel.top + 5))
+        self.screen.blit(render(self.info_font, "Press Enter for a new arena | ESC to Quit", (200, 200, 200)),
+                         (10, panel.top + 32))
+
+    def render(self):
+        self.draw_board()
+        self.draw_ui_panel()
+        pygame.display.flip()
 
+    def run(self):
+        arena = self.arena
+        running = True
+        next_tick = next_frame = time.perf_counter()
+        while running:
+            for event in pygame.event.get():
+                if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                    running = False
+                elif event.type == KEYDOWN and event.key == K_RETURN:
+                    arena.reset()
+
+            now = time.perf_counter()
+            ticks = 0
+            while now >= next_tick and not arena.done and ticks < MAX_CATCH_UP_TICKS:
+                arena.step()
+                next_tick += 1 / self.tick_rate
+                ticks += 1
+            if now >= next_tick:
+                next_tick = now + 1 / self.tick_rate
+
+            if now >= next_frame:
+                self.render()
+                next_frame = max(next_frame + 1 / self.frame_rate, now)
+
+            delay = min(next_tick, next_frame) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        arena.close()
+        print(f"arena: {arena.plans} plans, {arena.misses} missed the tick budget, {arena.fallbacks} fallback moves")
         pygame.quit()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crawling Cobras")
+    parser.add_argument('--tick-rate', type=float, default=8, help="simulation ticks per second")
+    parser.add_argument('--fps', type=float, default=30, help="rendered frames per second")
+    parser.add_argument('--input-rate', type=float, default=60, help="event polls per second")
+    parser.add_argument('--turbo', action='store_true', help="simulate as fast as possible (toggle with T)")
+    parser.add_argument('--turbo-render-every', type=int, default=100, help="ticks between frames in turbo mode")
+    parser.add_argument('--dirty', action='store_true', help="redraw only changed cells (toggle with R)")
+    parser.add_argument('--width', type=int, default=GRID_WIDTH, help=f"board width in cells (up to {MAX_GRID_SIZE})")
+    parser.add_argument('--height', type=int, default=GRID_HEIGHT, help=f"board height in cells (up to {MAX_GRID_SIZE})")
+    parser.add_argument('--plan-budget', type=int, default=2000, help="node expansions per Anytime search (N)")
+    parser.add_argument('--plan-time-budget', type=float, default=None,
+                        help="milliseconds per Anytime search (default: half a tick or frame)")
+    parser.add_argument('--stats', default="stats.db", help="SQLite file for run statistics and the high score")
+    parser.add_argument('--replay', default="last_game.rpl", help="where the replay of the last game is saved")
+    parser.add_argument('--profile', action='store_true', help="time each phase of the loop (P prints a summary)")
+    parser.add_argument('--telemetry', help="stream score, planning and frame times to this JSON-lines file")
+    parser.add_argument('--telemetry-every', type=int, default=1, help="keep every Nth tick in the telemetry")
+    parser.add_argument('--sync-planning', action='store_true', help="plan on the game thread instead of a worker")
+    parser.add_argument('--plan-deadline', type=float, default=None,
+                        help="milliseconds a plan may take before the fallback move is used (default: one tick)")
+    parser.add_argument('--arena', type=int, default=0, metavar='SNAKES', help="watch this many AI snakes share a board")
+    parser.add_argument('--apples', type=int, default=8, help="apples on the board in arena mode")
+    parser.add_argument('--arena-workers', type=int, default=None,
+                        help="processes planning the arena snakes (0 plans inline; default: all cores)")
+    args = parser.parse_args()
+    if args.plan_budget < 1:
+        parser.error("--plan-budget must be at least 1")
+    if args.telemetry_every < 1:
+        parser.error("--telemetry-every must be at least 1")
+    # The arena has no Hamiltonian fallback, so odd boards are fine there
+    error = grid_size_error(args.width, args.height, cycle=not args.arena)
+    if error:
+        parser.error(error)
+    return args
+
 if __name__ == "__main__":
-    game = Game()
+    args = parse_args()
+    if args.arena:
+        # Every snake's plan for a tick has to be back within half the tick
+        workers = os.cpu_count() if args.arena_workers is None else args.arena_workers
+        arena = Arena(args.arena, args.apples, args.width, args.height, workers=workers,
+                      tick_budget=0.5 / args.tick_rate, plan_budget=args.plan_budget, respawn=True)
+        ArenaView(arena, args.tick_rate, args.fps).run()
+        raise SystemExit
+    game = Game(dirty_rendering=args.dirty, tick_rate=args.tick_rate, frame_rate=args.fps,
+                input_rate=args.input_rate, turbo=args.turbo, turbo_render_every=args.turbo_render_every,
+                async_planning=not args.sync_planning,
+                plan_deadline=args.plan_deadline / 1000 if args.plan_deadline is not None else None,
+                plan_budget=args.plan_budget, stats_path=args.stats, replay_path=args.replay,
+                profile=args.profile,
+                telemetry=TelemetrySink(args.telemetry, args.telemetry_every) if args.telemetry else None,
+                width=args.width, height=args.height,
+                plan_time_budget=args.plan_time_budget / 1000 if args.plan_time_budget is not None else None)
     game.run()
-
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,
+    strategy TEXT,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    steps INTEGER NOT NULL,
+    death_cause TEXT,
+    seed INTEGER,
+    wall_clock REAL
+);
+CREATE TABLE IF NOT EXISTS high_score (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    score INTEGER NOT NULL
+);
+"""
+
+# Run statistics and the high score in SQLite (WAL mode). record_run() and
+# update_high_score() only append to an in-memory queue; a background thread
+# writes the queue out in one transaction per batch, so the game loop and the
+# headless runners never wait on the disk. The high score lives in the same
+# database, and is optionally mirrored to a text file replaced atomically.
+class StatsStore:
+    def __init__(self, path="stats.db", batch_size=5000, flush_interval=1.0, high_score_path=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.high_score_path = high_score_path
+        self.pending = deque()
+        self.written = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        row = self.conn.execute("SELECT score FROM high_score WHERE id = 0").fetchone()
+        self.best = row[0] if row else self.legacy_high_score()
+        self.saved_best = row[0] if row else 0
+
+        self.wake = threading.Event()
+        self.stopping = False
+        self.thread = threading.Thread(target=self.flush_loop, name="stats-writer", daemon=True)
+        self.thread.start()
+
+    def legacy_high_score(self):
+        # Carry over the score kept in the plain text file by older versions
+        if self.high_score_path is None:
+            return 0
+        try:
+            with open(self.high_score_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def high_score(self):
+        return self.best
+
+    def update_high_score(self, score):
+        if score > self.best:
+            self.best = score
+            self.wake.set()
+
+    def record_run(self, score, length, steps, strategy=None, death_cause=None, seed=None, wall_clock=None):
+        self.pending.append((time.time(), strategy, score, length, steps, death_cause, seed, wall_clock))
+        self.update_high_score(score)
+        if len(self.pending) >= self.batch_size:
+            self.wake.set()
+
+    def record_runs(self, runs):
+        # Bulk form for headless runners: an iterable of record_run() argument tuples
+        now = time.time()
+        best = self.best
+        for score, length, steps, strategy, death_cause, seed, wall_clock in runs:
+            self.pending.append((now, strategy, score, length, steps, death_cause, seed, wall_clock))
+            best = max(best, score)
+        self.update_high_score(best)
+        if len(self.pending) >= self.batch_size:
+            self.wake.set()
+
+    def flush_loop(self):
+        while not self.stopping:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        batch = []
+        pending = self.pending
+        while pending:
+            batch.append(pending.popleft())
+        best = self.best
+        if not batch and best == self.saved_best:
+            return
+
+        # Runs and the high score go in together, a crash leaves both or neither
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("INSERT INTO runs (finished, strategy, score, length, steps, death_cause, seed, wall_clock) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            if best > self.saved_best:
+                conn.execute("INSERT INTO high_score (id, score) VALUES (0, ?) "
+                             "ON CONFLICT(id) DO UPDATE SET score = max(score, excluded.score)", (best,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.written += len(batch)
+
+        if best > self.saved_best:
+            self.saved_best = best
+            if self.high_score_path is not None:
+                self.write_high_score_file(best)
+
+    def write_high_score_file(self, score):
+        # Write a temporary file and rename it over the old one, so a crash can
+        # never leave a truncated high score behind
+        tmp = self.high_score_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(score))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.high_score_path)
+
+    def close(self):
+        self.stopping = True
+        self.wake.set()
+        self.thread.join()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+from array import array
+
+DEATH_CAUSES = (None, 'wall', 'self', 'board_full', 'timeout')
+DEATH_CODES = {cause: code for code, cause in enumerate(DEATH_CAUSES)}
+
+# Streams per-tick samples from a SnakeEnv to a JSON-lines file. Attach it as
+# env.telemetry: step() calls record(), which writes into columns of a ring
+# preallocated as arrays, so recording allocates nothing and never touches the
+# disk. A background thread drains the ring every flush_interval seconds and
+# rotates the file at max_bytes, keeping `backups` old files (path.1, path.2...).
+# Only every sample_every-th tick is kept; the tick a game ends always is.
+# The writer is woken early once the ring is half full; if it still falls a
+# whole ring behind, new samples are dropped and counted.
+class TelemetrySink:
+    def __init__(self, path="telemetry.jsonl", sample_every=1, capacity=8192, flush_interval=1.0,
+                 max_bytes=64 << 20, backups=3):
+        if sample_every < 1:
+            raise ValueError(f"telemetry needs sample_every of at least 1, not {sample_every}")
+        self.path = path
+        self.sample_every = sample_every
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+        self.time = array('d', [0.0]) * capacity
+        self.seed = array('Q', [0]) * capacity
+        self.tick = array('q', [0]) * capacity
+        self.score = array('q', [0]) * capacity
+        self.length = array('q', [0]) * capacity
+        self.plan_ns = array('q', [0]) * capacity
+        self.fallbacks = array('q', [0]) * capacity
+        self.frame_ns = array('q', [0]) * capacity
+        self.death = array('b', [-1]) * capacity
+        self.written = 0  # slots filled so far; slot = index % capacity
+        self.flushed = 0
+        self.dropped = 0
+        self.ticks = 0
+        self.last_frame_ns = 0
+
+        self.file = open(path, 'a')
+        self.wake = threading.Event()
+        self.stopping = False
+        self.thread = threading.Thread(target=self.flush_loop, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    def frame(self, elapsed_ns):
+        # Windowed front ends report their frame time; samples carry the latest
+        self.last_frame_ns = elapsed_ns
+
+    def record(self, env):
+        self.ticks += 1
+        if not env.done and self.ticks % self.sample_every:
+            return
+        i = self.written
+        if i - self.flushed >= self.capacity:
+            self.dropped += 1
+            return
+        slot = i % self.capacity
+        self.time[slot] = time.time()
+        self.seed[slot] = env.seed & 0xFFFFFFFFFFFFFFFF
+        self.tick[slot] = env.steps
+        self.score[slot] = env.score
+        self.length[slot] = env.snake.length
+        self.plan_ns[slot] = env.plan_ns
+        self.fallbacks[slot] = env.fallbacks
+        self.frame_ns[slot] = self.last_frame_ns
+        self.death[slot] = DEATH_CODES.get(env.death_cause, 0) if env.done else -1
+        self.written = i + 1
+        if self.written - self.flushed == self.capacity // 2:
+            self.wake.set()
+
+    def flush_loop(self):
+        while not self.stopping:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        end = self.written
+        lines = []
+        for i in range(self.flushed, end):
+            slot = i % self.capacity
+            line = (f'{{"t": {self.time[slot]:.6f}, "seed": {self.seed[slot]}, "tick": {self.tick[slot]}, '
+                    f'"score": {self.score[slot]}, "length": {self.length[slot]}, "plan_us": {self.plan_ns[slot] / 1000:.1f}, '
+                    f'"fallbacks": {self.fallbacks[slot]}, "frame_us": {self.frame_ns[slot] / 1000:.1f}')
+            death = self.death[slot]
+            if death >= 0:
+                line += f', "game_over": {json.dumps(DEATH_CAUSES[death])}'
+            lines.append(line + '}\n')
+        self.flushed = end
+        if not lines:
+            return
+        self.file.write(''.join(lines))
+        self.file.flush()
+        if self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'a')
+
+    def close(self):
+        self.stopping = True
+        self.wake.set()
+        self.thread.join()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,52 @@
+import pytest
+
+from arena import Arena
+from engine import Snake
+
+
+def grown(grid, start, direction, length):
+    snake = Snake(grid, grid.cell(*start))
+    snake.direction = direction
+    snake.length = length
+    for _ in range(length - 1):
+        snake.walk()
+    return snake
+
+
+def board(*snakes):
+    # snakes are (start, direction, length); each walks length - 1 cells from start
+    arena = Arena(num_snakes=len(snakes), num_apples=0, width=10, height=10, seed=0)
+    arena.grid.clear()
+    arena.snakes = [grown(arena.grid, *snake) for snake in snakes]
+    return arena
+
+
+@pytest.mark.parametrize("left_length, right_length, dead", [(3, 2, [1]), (2, 3, [0]), (2, 2, [0, 1])])
+def test_heads_meeting_on_one_cell(left_length, right_length, dead):
+    arena = board(((4 - left_length, 5), 'right', left_length), ((4 + right_length, 5), 'left', right_length))
+    _, dying = arena.step({})
+    assert sorted(dying) == dead
+    assert set(dying.values()) == {'head_on'}
+
+
+@pytest.mark.parametrize("left_length, right_length, dead", [(3, 2, [1]), (2, 3, [0]), (2, 2, [0, 1])])
+def test_heads_swapping_cells(left_length, right_length, dead):
+    arena = board(((4 - left_length, 5), 'right', left_length), ((3 + right_length, 5), 'left', right_length))
+    _, dying = arena.step({})
+    assert sorted(dying) == dead
+    assert set(dying.values()) == {'head_on'}
+    for i in {0, 1} - set(dying):
+        assert arena.alive[i]
+        assert arena.grid.occupancy[arena.snakes[i].head_cell] == 1
+
+
+def test_respawns_skip_apples_and_reuse_snakes():
+    arena = Arena(num_snakes=40, num_apples=8, width=30, height=20, seed=3, respawn=True)
+    snakes = list(arena.snakes)
+    deaths = 0
+    for _ in range(500):
+        _, dying = arena.step()
+        deaths += len(dying)
+        assert all(arena.grid.occupancy[apple.cell] == 0 for apple in arena.apples)
+    assert deaths
+    assert all(a is b for a, b in zip(arena.snakes, snakes))
@@ -0,0 +1,59 @@
+import pytest
+
+from engine import AnytimeSearch, SnakeEnv, grid_size_error
+
+def test_anytime_budget_must_be_positive():
+    with pytest.raises(ValueError):
+        AnytimeSearch(0)
+    with pytest.raises(ValueError):
+        SnakeEnv(search_strategy="Anytime", plan_budget=0)
+
+def test_anytime_budget_of_one_plans():
+    env = SnakeEnv(search_strategy="Anytime", plan_budget=1, seed=3, max_steps=50)
+    while not env.done:
+        env.step()
+    assert env.anytime.searches > 0
+
+@pytest.mark.parametrize("width, height", [(25, 11), (9, 9), (3, 3), (2, 10), (1001, 12)])
+def test_unplayable_grid_sizes_are_rejected(width, height):
+    assert grid_size_error(width, height)
+    with pytest.raises(ValueError):
+        SnakeEnv(width=width, height=height)
+
+@pytest.mark.parametrize("width, height", [(25, 12), (9, 10), (3, 4), (1000, 1000)])
+def test_grid_sizes_with_a_closed_cycle_are_accepted(width, height):
+    assert grid_size_error(width, height) is None
+
+def test_odd_grids_are_fine_without_a_cycle():
+    assert grid_size_error(9, 9, cycle=False) is None
+
+@pytest.mark.parametrize("strategy", ["A*", "BFS", "Anytime", "Safe", "Hamiltonian"])
+def test_plan_never_reverses(strategy):
+    # A length 1 snake with the apple right behind it would plan straight back,
+    # which turn() ignores, and run on into whatever is ahead
+    env = SnakeEnv(search_strategy=strategy, seed=0)
+    snake = env.snake
+    env.apple.cell = snake.behind_cell
+    backwards = env.grid.step_directions[snake.behind_cell - snake.head_cell]
+    assert env.plan() not in (None, backwards)
+
+def test_step_leaves_the_body_out():
+    env = SnakeEnv(seed=0)
+    observation = env.step()[0]
+    assert 'body' not in observation
+    assert observation['head'] == env.snake.head_cell
+    assert list(env.observe()['body']) == list(env.snake.body)
+
+@pytest.mark.parametrize("strategy", ["A*", "BFS", "Anytime"])
+@pytest.mark.parametrize("growing", [False, True])
+def test_tail_is_only_free_when_it_moves(strategy, growing):
+    # Head at (3, 2) with the tail right beside it at (2, 2), and the apple
+    # just past the tail. A tail that stays put this tick is body.
+    env = SnakeEnv(search_strategy=strategy, seed=0)
+    grid = env.grid
+    body = [grid.cell(3, 2), grid.cell(3, 3), grid.cell(2, 3), grid.cell(2, 2)]
+    env.restore(body, len(body) + growing, 'up', grid.cell(1, 2), env.rng.getstate(), 0, 0, 0)
+    path = env.find_path()
+    assert path[-1] == grid.cell(1, 2)
+    if growing:
+        assert grid.cell(2, 2) not in path
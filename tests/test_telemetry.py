@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from engine import SnakeEnv
+from planner import AsyncPlanner
+from telemetry import TelemetrySink
+
+def test_sample_every_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        TelemetrySink(str(tmp_path / "t.jsonl"), sample_every=0)
+
+def test_async_planner_fallbacks_reach_telemetry(tmp_path):
+    path = tmp_path / "t.jsonl"
+    env = SnakeEnv(search_strategy="Hamiltonian", seed=1, max_steps=50)
+    planner = AsyncPlanner(env, deadline=1.0)
+    with TelemetrySink(str(path)) as sink:
+        env.telemetry = sink
+        while not env.done:
+            env.step(planner.next_direction())
+    planner.close()
+    samples = [json.loads(line) for line in path.read_text().splitlines()]
+    assert planner.fallbacks > 0
+    assert samples[-1]['fallbacks'] == env.fallbacks == planner.fallbacks
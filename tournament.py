@@ -0,0 +1,141 @@
+import argparse
+import csv
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import GRID_HEIGHT, GRID_WIDTH, STRATEGIES, SnakeEnv, grid_size_error
+from stats import StatsStore
+from telemetry import TelemetrySink
+
+FIELDS = ('episode', 'seed', 'strategy', 'score', 'length', 'steps', 'steps_per_apple', 'death_cause', 'wall_clock',
+          'searches', 'cache_hits', 'partial_plans', 'budget_used')
+
+def telemetry_path(path):
+    # One file per worker process, they can't share a writer
+    root, ext = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{ext}"
+
+def run_episode(job):
+    episode, seed, strategy, max_steps, plan_budget, telemetry, sample_every, width, height = job
+    env = SnakeEnv(search_strategy=strategy, seed=seed, max_steps=max_steps, plan_budget=plan_budget, width=width,
+                   height=height)
+    if telemetry:
+        env.telemetry = TelemetrySink(telemetry_path(telemetry), sample_every)
+    start = time.perf_counter()
+    while not env.done:
+        env.step()
+    elapsed = time.perf_counter() - start
+    if telemetry:
+        env.telemetry.close()
+    return {
+        'episode': episode,
+        'seed': seed,
+        'strategy': strategy,
+        'score': env.score,
+        'length': env.snake.length,
+        'steps': env.steps,
+        'steps_per_apple': env.steps / env.score if env.score else None,
+        'death_cause': env.death_cause,
+        'wall_clock': elapsed,
+        'searches': env.path_cache.misses,
+        'cache_hits': env.path_cache.hits,
+        'partial_plans': env.anytime.partial,
+        'budget_used': env.anytime.mean_used() if strategy == "Anytime" else None,
+    }
+
+def episode_seeds(master_seed, episodes):
+    # Every strategy plays episode i with the same seed, so they all see the same apples
+    rng = random.Random(master_seed)
+    return [rng.getrandbits(32) for _ in range(episodes)]
+
+def run_tournament(episodes, master_seed, strategies=STRATEGIES, max_steps=20000, workers=None, plan_budget=2000,
+                   telemetry=None, telemetry_every=100, width=GRID_WIDTH, height=GRID_HEIGHT):
+    jobs = [(i, seed, strategy, max_steps, plan_budget, telemetry, telemetry_every, width, height)
+            for i, seed in enumerate(episode_seeds(master_seed, episodes))
+            for strategy in strategies]
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        return [run_episode(job) for job in jobs]
+
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_episode, jobs, chunksize=chunksize))
+
+def summarize(results, strategies):
+    rows = []
+    for strategy in strategies:
+        runs = [r for r in results if r['strategy'] == strategy]
+        if not runs:
+            continue
+        rates = [r['steps_per_apple'] for r in runs if r['steps_per_apple'] is not None]
+        rows.append({
+            'strategy': strategy,
+            'episodes': len(runs),
+            'mean_score': sum(r['score'] for r in runs) / len(runs),
+            'max_score': max(r['score'] for r in runs),
+            'steps_per_apple': sum(rates) / len(rates) if rates else None,
+            'wall_clock': sum(r['wall_clock'] for r in runs) / len(runs),
+            'searches': sum(r['searches'] for r in runs),
+            'cache_hits': sum(r['cache_hits'] for r in runs),
+            'deaths': Counter(r['death_cause'] for r in runs),
+        })
+    return rows
+
+def print_summary(rows):
+    print(f"{'strategy':<12} {'episodes':>8} {'mean':>7} {'max':>5} {'steps/apple':>11} {'sec/ep':>8} "
+          f"{'cache hit':>9}  deaths")
+    for row in rows:
+        rate = f"{row['steps_per_apple']:.1f}" if row['steps_per_apple'] is not None else '-'
+        lookups = row['searches'] + row['cache_hits']
+        hit_rate = f"{100 * row['cache_hits'] / lookups:.0f}%" if lookups else '-'
+        deaths = ', '.join(f"{cause}={n}" for cause, n in sorted(row['deaths'].items()))
+        print(f"{row['strategy']:<12} {row['episodes']:>8} {row['mean_score']:>7.2f} {row['max_score']:>5} "
+              f"{rate:>11} {row['wall_clock']:>8.4f} {hit_rate:>9}  {deaths}")
+
+def write_csv(path, results):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Play every AI strategy on the same seeded episodes")
+    parser.add_argument('--episodes', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help="master seed the episode seeds are drawn from")
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES), choices=STRATEGIES)
+    parser.add_argument('--max-steps', type=int, default=20000)
+    parser.add_argument('--plan-budget', type=int, default=2000, help="node expansions per Anytime search")
+    parser.add_argument('--width', type=int, default=GRID_WIDTH, help="board width in cells")
+    parser.add_argument('--height', type=int, default=GRID_HEIGHT, help="board height in cells")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--csv', help="write one row per episode to this file")
+    parser.add_argument('--stats', help="append every episode to this SQLite statistics store")
+    parser.add_argument('--telemetry', help="stream ticks to JSON-lines files (one per worker, named after this)")
+    parser.add_argument('--telemetry-every', type=int, default=100, help="keep every Nth tick in the telemetry")
+    args = parser.parse_args()
+    if args.plan_budget < 1:
+        parser.error("--plan-budget must be at least 1")
+    if args.telemetry_every < 1:
+        parser.error("--telemetry-every must be at least 1")
+    if grid_size_error(args.width, args.height):
+        parser.error(grid_size_error(args.width, args.height))
+
+    start = time.perf_counter()
+    results = run_tournament(args.episodes, args.seed, args.strategies, args.max_steps, args.workers, args.plan_budget,
+                             args.telemetry, args.telemetry_every, args.width, args.height)
+    elapsed = time.perf_counter() - start
+
+    print_summary(summarize(results, args.strategies))
+    print(f"{len(results)} episodes in {elapsed:.2f}s ({len(results) / elapsed:.1f} episodes/s)")
+    if args.csv:
+        write_csv(args.csv, results)
+    if args.stats:
+        with StatsStore(args.stats) as store:
+            store.record_runs((r['score'], r['length'], r['steps'], r['strategy'], r['death_cause'], r['seed'],
+                               r['wall_clock']) for r in results)
+
+if __name__ == '__main__':
+    main()